@@ -1,13 +1,25 @@
-from typing import List, Dict, Any, Optional, Tuple
-from fastapi import APIRouter, HTTPException
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+import asyncio
+import os
 import time
-import statistics
-from app.apis.serper import BusinessData, BusinessSearchResponse, search_local_businesses, BusinessFilterRequest
+from app.apis.serper import BusinessData, BusinessSearchResponse, search_unique_businesses, BusinessFilterRequest, iter_businesses, store_leads, save_result_set, LEAD_STORE_CHUNK_SIZE
+from app.libs.streaming import stream_frames
+from app.libs.business_stats import BusinessStatsAccumulator
+from app.libs.business_frame import BusinessFrame, as_frame
+from app.libs.chain_matcher import get_chain_matcher
+from app.libs.opportunity_scoring import ScoringProfile, get_scoring_profile, get_scoring_profiles
+from app.libs.lead_store import get_lead_store, lead_key, business_fingerprint, normalize_location
 
 # Create router
 router = APIRouter()
 
+# Incremental analysis refetches a location once its last fetch is older than this
+ANALYSIS_STALENESS_SECONDS = float(os.environ.get("ANALYSIS_STALENESS_SECONDS", "86400"))
+
 # Models
 class BusinessOpportunity(BaseModel):
     business_data: BusinessData
@@ -22,6 +34,11 @@ class BusinessAnalysisRequest(BaseModel):
     min_reviews: Optional[int] = Field(0, description="Minimum number of reviews required")
     exclude_chains: Optional[bool] = Field(False, description="Whether to try to exclude chain businesses")
     opportunity_threshold: Optional[float] = Field(50.0, description="Minimum opportunity score to include", ge=0, le=100)
+    bypass_cache: Optional[bool] = Field(False, description="Skip the query cache and fetch fresh results from Serper")
+    paginate: Optional[bool] = Field(False, description="Fetch multiple Serper result pages to analyze more than 100 businesses")
+    scoring_profile: Optional[str] = Field("default", description="Name of the weight/threshold profile used to score opportunities")
+    incremental: Optional[bool] = Field(False, description="Reuse stored results and scores, refetching only when the last fetch is stale, and report what changed")
+    staleness_seconds: Optional[float] = Field(None, description="Refetch when the last fetch is older than this (incremental only; defaults to ANALYSIS_STALENESS_SECONDS)", ge=0)
 
 class CategoryStats(BaseModel):
     category: str
@@ -30,208 +47,165 @@ class CategoryStats(BaseModel):
     website_percentage: float
     opportunity_score: float
 
+class AnalysisChange(BaseModel):
+    lead_key: str
+    name: str
+    change: str = Field(..., description="'new', 'changed' or 'removed' since the previous fetch")
+    opportunity_score: Optional[float] = Field(None, description="Current score, when the business passed the analysis filters")
+
+class IncrementalSummary(BaseModel):
+    refetched: bool = Field(..., description="Whether results were refetched from Serper rather than read from the lead store")
+    fetched_at: float
+    previous_fetched_at: Optional[float] = None
+    unchanged_count: int
+    rescored_count: int = Field(..., description="Businesses scored in this run rather than reusing a stored score")
+    changes: List[AnalysisChange]
+
 class BusinessAnalysisResponse(BaseModel):
     opportunities: List[BusinessOpportunity]
     total_opportunities: int
     location_stats: Dict[str, Any]
     category_stats: Optional[List[CategoryStats]] = None
+    incremental: Optional[IncrementalSummary] = None
+    result_set_id: Optional[str] = Field(None, description="Id of the saved opportunities (with scores), for asking about them later")
     timestamp: float
 
 # Helper functions
-def calculate_opportunity_score(business: BusinessData) -> Tuple[float, List[str], List[str]]:
+def calculate_opportunity_score(business: BusinessData, profile: Optional[ScoringProfile] = None) -> Tuple[float, List[str], List[str]]:
     """
     Calculate an opportunity score for a business (0-100).
     100 = perfect opportunity, 0 = no opportunity
     Also returns lists of reasons and improvement areas
     """
-    score = 0
-    reasons = []
-    improvements = []
-    
-    # No website is a huge opportunity
-    if not business.has_website:
-        score += 40
-        reasons.append("No website detected")
-        improvements.append("Create a professional business website")
-    
-    # Rating opportunities
-    if business.rating is not None:
-        if business.rating < 2.5:
-            score += 30
-            reasons.append(f"Very low rating ({business.rating}/5)")
-            improvements.append("Online presence could help address reputation issues")
-        elif business.rating < 3.5:
-            score += 20
-            reasons.append(f"Below average rating ({business.rating}/5)")
-            improvements.append("Web presence to highlight positive aspects of business")
-    else:
-        # No rating could be an opportunity (new or unrated)
-        score += 15
-        reasons.append("No Google rating available")
-        improvements.append("Web presence to establish online reputation")
-    
-    # Reviews count opportunities
-    if business.reviews_count is not None:
-        if business.reviews_count < 5:
-            score += 15
-            reasons.append(f"Very few reviews ({business.reviews_count})")
-            improvements.append("Web presence to encourage more customer reviews")
-        elif business.reviews_count < 20:
-            score += 10
-            reasons.append(f"Limited number of reviews ({business.reviews_count})")
-            improvements.append("Website with review integration")
-    else:
-        # No reviews is an opportunity
-        score += 15
-        reasons.append("No reviews available")
-        improvements.append("Website with testimonial section")
-    
-    # Cap score at 100
-    score = min(score, 100)
-    
-    return score, reasons, improvements
+    return (profile or get_scoring_profile()).score_one(business)
+
+def resolve_scoring_profile(name: Optional[str]) -> ScoringProfile:
+    """Look up a scoring profile, turning unknown names into a 400 error"""
+    try:
+        return get_scoring_profile(name or "default")
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0])) from e
+
+def is_chain_business(business: BusinessData) -> bool:
+    """Check if a business name contains a known chain brand"""
+    return get_chain_matcher().matches(business.name)
 
 def filter_chain_businesses(businesses: List[BusinessData]) -> List[BusinessData]:
     """
     Attempt to filter out businesses that are likely chains
     based on naming patterns and other heuristics
     """
-    # Common chain words
-    chain_indicators = [
-        "mcdonalds", "walmart", "starbucks", "subway", "7-eleven",
-        "tim hortons", "canadian tire", "home depot", "best buy", "costco",
-        "safeway", "save-on-foods", "shoppers drug mart", "pizza hut", "wendys",
-        "burger king", "boston pizza", "red lobster", "kfc", "a&w",
-        "dairy queen", "dollarama", "shell", "petro-canada", "esso",
-        "the brick", "staples", "mcdonalds", "subway", "dominos",
-        "papa johns", "wendys", "taco bell", "harveys"
-    ]
-    
-    filtered_businesses = []
-    
-    for business in businesses:
-        # Check if business name contains chain indicators
-        is_chain = False
-        name_lower = business.name.lower()
-        
-        for indicator in chain_indicators:
-            if indicator in name_lower:
-                is_chain = True
-                break
-        
-        if not is_chain:
-            filtered_businesses.append(business)
-    
-    return filtered_businesses
+    matcher = get_chain_matcher()
+    return [business for business in businesses if not matcher.matches(business.name)]
 
-def analyze_location_stats(businesses: List[BusinessData]) -> Dict[str, Any]:
+def analyze_location_stats(businesses: Union[List[BusinessData], BusinessFrame]) -> Dict[str, Any]:
     """
     Analyze location-based statistics for the given businesses
     """
-    stats = {
-        "total_businesses": len(businesses),
-        "businesses_with_website": 0,
-        "businesses_without_website": 0,
-        "avg_rating": None,
-        "rating_distribution": {
-            "0-1": 0,
-            "1-2": 0,
-            "2-3": 0,
-            "3-4": 0,
-            "4-5": 0,
-            "no_rating": 0
-        }
-    }
+    return as_frame(businesses).location_stats()
+
+def analyze_category_stats(businesses: Union[List[BusinessData], BusinessFrame]) -> List[CategoryStats]:
+    """
+    Group businesses by category and analyze stats for each category
+    """
+    return [CategoryStats(**stats) for stats in as_frame(businesses).category_stats()]
+
+def build_serper_request(request: BusinessAnalysisRequest) -> BusinessFilterRequest:
+    """Build the Serper search request for an analysis request"""
+    return BusinessFilterRequest(
+        location=request.location,
+        category=request.category,
+        max_results=request.max_results,
+        filter_no_website=False,  # We'll do our own filtering
+        max_rating=None,  # We'll do our own filtering
+        bypass_cache=request.bypass_cache,
+        paginate=request.paginate
+    )
+
+def fetch_key(request: BusinessAnalysisRequest) -> str:
+    """Identify the Serper query behind an analysis request for staleness tracking"""
+    category = (request.category or "").strip().lower()
+    return f"{normalize_location(request.location)}|{category}|{request.max_results}|{bool(request.paginate)}"
+
+async def fetch_incremental(request: BusinessAnalysisRequest) -> Tuple[List[BusinessData], IncrementalSummary, Optional[Dict[str, str]]]:
+    """
+    Return the businesses for an incremental analysis, refetching only when the
+    last fetch of this query is stale, along with the new/changed/removed diff
+    against that fetch (scores are filled in later). After a refetch the new
+    fingerprints are returned too; the caller records the fetch once the leads are stored.
+    """
+    store = get_lead_store()
+    key = fetch_key(request)
+    previous = await asyncio.to_thread(store.get_fetch, key)
+    staleness = ANALYSIS_STALENESS_SECONDS if request.staleness_seconds is None else request.staleness_seconds
     
-    ratings = []
+    if previous is not None and not request.bypass_cache and time.time() - previous["fetched_at"] < staleness:
+        # Still fresh: serve the previous result set from the lead store
+        leads = await asyncio.to_thread(store.get_leads, list(previous["fingerprints"]))
+        if len(leads) == len(previous["fingerprints"]):
+            businesses = [BusinessData(**lead["business"]) for lead in leads]
+            return businesses, IncrementalSummary(
+                refetched=False,
+                fetched_at=previous["fetched_at"],
+                previous_fetched_at=previous["fetched_at"],
+                unchanged_count=len(businesses),
+                rescored_count=0,
+                changes=[]
+            ), None
+        # Some leads of the previous fetch are missing from the store, so it cannot be served
+        print(f"Lead store has {len(leads)} of {len(previous['fingerprints'])} leads for {key}, refetching")
     
-    for business in businesses:
-        # Website stats
-        if business.has_website:
-            stats["businesses_with_website"] += 1
-        else:
-            stats["businesses_without_website"] += 1
-        
-        # Rating stats
-        if business.rating is not None:
-            ratings.append(business.rating)
-            
-            # Rating distribution
-            if business.rating < 1:
-                stats["rating_distribution"]["0-1"] += 1
-            elif business.rating < 2:
-                stats["rating_distribution"]["1-2"] += 1
-            elif business.rating < 3:
-                stats["rating_distribution"]["2-3"] += 1
-            elif business.rating < 4:
-                stats["rating_distribution"]["3-4"] += 1
-            else:
-                stats["rating_distribution"]["4-5"] += 1
-        else:
-            stats["rating_distribution"]["no_rating"] += 1
+    # Stale or never fetched: go to Serper, skipping the short-lived query cache
+    serper_request = build_serper_request(request)
+    serper_request.bypass_cache = True
+    businesses, _ = await search_unique_businesses(serper_request)
+    
+    fingerprints = {lead_key(business): business_fingerprint(business) for business in businesses}
+    previous_fingerprints = previous["fingerprints"] if previous else {}
     
-    # Calculate average rating if we have any
-    if ratings:
-        stats["avg_rating"] = statistics.mean(ratings)
+    changes = []
+    for business in businesses:
+        identity = lead_key(business)
+        if identity not in previous_fingerprints:
+            changes.append(AnalysisChange(lead_key=identity, name=business.name, change="new"))
+        elif previous_fingerprints[identity] != fingerprints[identity]:
+            changes.append(AnalysisChange(lead_key=identity, name=business.name, change="changed"))
     
-    # Website percentage
-    if businesses:
-        stats["website_percentage"] = (stats["businesses_with_website"] / stats["total_businesses"]) * 100
-    else:
-        stats["website_percentage"] = 0
+    removed_keys = [identity for identity in previous_fingerprints if identity not in fingerprints]
+    if removed_keys:
+        removed = await asyncio.to_thread(store.get_leads, removed_keys)
+        changes.extend(AnalysisChange(lead_key=lead["lead_key"], name=lead["business"]["name"], change="removed") for lead in removed)
     
-    return stats
+    return businesses, IncrementalSummary(
+        refetched=True,
+        fetched_at=time.time(),
+        previous_fetched_at=previous["fetched_at"] if previous else None,
+        unchanged_count=len(businesses) - sum(1 for change in changes if change.change != "removed"),
+        rescored_count=0,
+        changes=changes
+    ), fingerprints
 
-def analyze_category_stats(businesses: List[BusinessData]) -> List[CategoryStats]:
-    """
-    Group businesses by category and analyze stats for each category
-    """
-    # Group businesses by category
-    categories = {}
-    for business in businesses:
-        category = business.category or "Uncategorized"
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(business)
+async def score_with_reuse(profile: ScoringProfile, businesses: List[BusinessData], frame: BusinessFrame) -> Tuple[np.ndarray, int]:
+    """Score businesses, reusing stored scores for unchanged businesses scored with an identical profile"""
+    # A stored score only counts if the stored content matches what was just fetched
+    stored = await asyncio.to_thread(get_lead_store().get_scores, [lead_key(business) for business in businesses])
+    profile_hash = profile.content_hash
     
-    # Calculate stats for each category
-    category_stats = []
-    for category, category_businesses in categories.items():
-        # Skip categories with too few businesses
-        if len(category_businesses) < 2:
-            continue
-        
-        # Count businesses with websites
-        with_website = sum(1 for b in category_businesses if b.has_website)
-        website_percentage = (with_website / len(category_businesses)) * 100
-        
-        # Calculate average rating
-        ratings = [b.rating for b in category_businesses if b.rating is not None]
-        avg_rating = statistics.mean(ratings) if ratings else None
-        
-        # Calculate opportunity score for category
-        # Low ratings and low website percentage = more opportunity
-        opp_score = 0
-        if avg_rating is not None:
-            rating_factor = max(0, 5 - avg_rating) / 5  # 0 to 1 scale
-            opp_score += rating_factor * 50
-        
-        # Website percentage factor (lower = better opportunity)
-        website_factor = (100 - website_percentage) / 100  # 0 to 1 scale
-        opp_score += website_factor * 50
-        
-        category_stats.append(CategoryStats(
-            category=category,
-            count=len(category_businesses),
-            avg_rating=avg_rating,
-            website_percentage=website_percentage,
-            opportunity_score=opp_score
-        ))
+    scores = np.empty(len(businesses), dtype=np.float64)
+    rescore = []
+    for i, business in enumerate(businesses):
+        score, score_profile_hash, fingerprint = stored.get(lead_key(business), (None, None, None))
+        if score is not None and score_profile_hash == profile_hash and fingerprint == business_fingerprint(business):
+            scores[i] = score
+        else:
+            rescore.append(i)
     
-    # Sort by opportunity score (highest first)
-    category_stats.sort(key=lambda x: x.opportunity_score, reverse=True)
+    if len(rescore) == len(businesses):
+        scores = profile.score_frame(frame)
+    elif rescore:
+        scores[rescore] = profile.score_frame(BusinessFrame.from_businesses([businesses[i] for i in rescore]))
     
-    return category_stats
+    return scores, len(rescore)
 
 # Endpoints
 @router.post("/analyze", response_model=BusinessAnalysisResponse)
@@ -240,19 +214,22 @@ async def analyze_business_opportunities(request: BusinessAnalysisRequest) -> Bu
     Analyze business opportunities based on location and category.
     Identifies and scores businesses that would benefit from web development services.
     """
+    profile = resolve_scoring_profile(request.scoring_profile)
+    
     try:
-        # Get business data from Serper API
-        serper_request = BusinessFilterRequest(
-            location=request.location,
-            category=request.category,
-            max_results=request.max_results,
-            filter_no_website=False,  # We'll do our own filtering
-            max_rating=None  # We'll do our own filtering
-        )
+        incremental = None
+        fingerprints = None
+        if request.incremental:
+            # Reuse the stored result set unless it is stale, and diff against the previous fetch
+            businesses, incremental, fingerprints = await fetch_incremental(request)
+        else:
+            # Get business data from Serper API
+            serper_request = build_serper_request(request)
+            
+            # Search without the endpoint's own persistence; leads are stored once below
+            businesses, _ = await search_unique_businesses(serper_request)
         
-        # Call the Serper API endpoint directly
-        search_response = search_local_businesses(serper_request)
-        businesses = search_response.businesses
+        fetched = businesses
         
         # Apply minimum reviews filter if specified
         if request.min_reviews > 0:
@@ -262,29 +239,57 @@ async def analyze_business_opportunities(request: BusinessAnalysisRequest) -> Bu
         if request.exclude_chains:
             businesses = filter_chain_businesses(businesses)
         
-        # Calculate opportunity scores for each business
-        opportunities = []
-        for business in businesses:
-            score, reasons, improvements = calculate_opportunity_score(business)
-            
-            # Only include if it meets the opportunity threshold
-            if score >= request.opportunity_threshold:
-                opportunity = BusinessOpportunity(
-                    business_data=business,
-                    opportunity_score=score,
-                    reasons=reasons,
-                    improvement_areas=improvements
-                )
-                opportunities.append(opportunity)
+        # Score every business in one vectorized pass over a columnar view
+        frame = BusinessFrame.from_businesses(businesses)
+        if incremental:
+            # Only businesses whose content changed (or that were never scored with this profile) are rescored
+            scores, incremental.rescored_count = await score_with_reuse(profile, businesses, frame)
+        else:
+            scores = profile.score_frame(frame)
+        
+        score_by_key = {lead_key(business): float(score) for business, score in zip(businesses, scores)}
+        if incremental:
+            for change in incremental.changes:
+                change.opportunity_score = score_by_key.get(change.lead_key)
         
-        # Sort opportunities by score (highest first)
-        opportunities.sort(key=lambda x: x.opportunity_score, reverse=True)
+        # Store every fetched lead once, with scores for those that passed the filters
+        stored = await store_leads(fetched, request.location, [score_by_key.get(lead_key(business)) for business in fetched], profile.name, profile.content_hash)
+        
+        # Record a refetch only once its leads are stored, so a fresh fetch record always has its leads
+        if fingerprints is not None and stored:
+            incremental.fetched_at = await asyncio.to_thread(
+                get_lead_store().record_fetch, fetch_key(request), request.location, request.category, fingerprints
+            )
+        
+        # Only include businesses that meet the opportunity threshold, highest score first
+        selected = np.nonzero(scores >= request.opportunity_threshold)[0]
+        selected = selected[np.argsort(-scores[selected], kind="stable")]
+        
+        # Reason and improvement text is only built for the businesses we return
+        opportunities = []
+        for i in selected:
+            reasons, improvements = profile.explain(businesses[i])
+            opportunities.append(BusinessOpportunity(
+                business_data=businesses[i],
+                opportunity_score=float(scores[i]),
+                reasons=reasons,
+                improvement_areas=improvements
+            ))
         
         # Analyze location stats
-        location_stats = analyze_location_stats(businesses)
+        location_stats = analyze_location_stats(frame)
         
         # Generate category stats
-        category_stats = analyze_category_stats(businesses) if len(businesses) >= 5 else None
+        category_stats = analyze_category_stats(frame) if len(businesses) >= 5 else None
+        
+        result_set_id = await save_result_set(
+            "analysis",
+            [lead_key(o.business_data) for o in opportunities],
+            request.location,
+            request.category,
+            [o.opportunity_score for o in opportunities],
+            profile.name
+        )
         
         # Return the response
         return BusinessAnalysisResponse(
@@ -292,8 +297,75 @@ async def analyze_business_opportunities(request: BusinessAnalysisRequest) -> Bu
             total_opportunities=len(opportunities),
             location_stats=location_stats,
             category_stats=category_stats,
+            incremental=incremental,
+            result_set_id=result_set_id,
             timestamp=time.time()
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing business opportunities: {str(e)}") from e
+
+@router.post("/analyze/stream", response_class=StreamingResponse)
+async def stream_business_opportunities(request: BusinessAnalysisRequest, http_request: Request) -> StreamingResponse:
+    """
+    Stream business opportunities as soon as each business is extracted and scored
+    (NDJSON, or SSE with Accept: text/event-stream). Opportunities arrive in extraction
+    order rather than sorted by score; a final summary frame carries location and category stats.
+    """
+    profile = resolve_scoring_profile(request.scoring_profile)
+    
+    async def frames():
+        stats = BusinessStatsAccumulator()
+        total_opportunities = 0
+        pending, pending_scores = [], []
+        # Only (lead key, score) pairs are kept for the result set, not the businesses themselves
+        selected_keys, selected_scores = [], []
+        
+        async for business in iter_businesses(build_serper_request(request)):
+            # Apply minimum reviews filter if specified
+            if request.min_reviews > 0 and (business.reviews_count is None or business.reviews_count < request.min_reviews):
+                continue
+            
+            # Filter chain businesses if requested
+            if request.exclude_chains and is_chain_business(business):
+                continue
+            
+            stats.add(business)
+            
+            # Only emit if it meets the opportunity threshold
+            score, reasons, improvements = calculate_opportunity_score(business, profile)
+            pending.append(business)
+            pending_scores.append(score)
+            if len(pending) >= LEAD_STORE_CHUNK_SIZE:
+                await store_leads(pending, request.location, pending_scores, profile.name, profile.content_hash)
+                pending, pending_scores = [], []
+            
+            if score >= request.opportunity_threshold:
+                total_opportunities += 1
+                selected_keys.append(lead_key(business))
+                selected_scores.append(score)
+                yield "opportunity", BusinessOpportunity(
+                    business_data=business,
+                    opportunity_score=score,
+                    reasons=reasons,
+                    improvement_areas=improvements
+                ).model_dump()
+        await store_leads(pending, request.location, pending_scores, profile.name, profile.content_hash)
+        
+        yield "summary", {
+            "total_opportunities": total_opportunities,
+            "location_stats": stats.location_stats(),
+            "category_stats": stats.category_stats() if stats.total >= 5 else None,
+            "result_set_id": await save_result_set("analysis", selected_keys, request.location, request.category, selected_scores, profile.name),
+            "timestamp": time.time()
+        }
+    
+    return stream_frames(http_request, frames())
+
+@router.get("/scoring-profiles")
+def list_scoring_profiles() -> Dict[str, Any]:
+    """List the configured opportunity scoring profiles"""
+    return {
+        "profiles": [profile.model_dump() for profile in get_scoring_profiles().values()],
+        "timestamp": time.time()
+    }
@@ -1,13 +1,68 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-import google.generativeai as genai
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import asyncio
+import hashlib
+import hmac
 import json
+import os
 import time
+from app.libs.model_catalog import ModelCatalog, ModelCatalogCache, DEFAULT_MODEL
+from app.libs.streaming import stream_frames
+from app.libs.latency import LatencyRecorder
+from app.libs.metrics import UPSTREAM_LATENCY, UPSTREAM_RETRIES, track
+from app.libs.gemini_clients import get_gemini_client_pool
+from app.libs.cache import TieredCache
+from app.libs.singleflight import SingleFlight
+from app.libs.rate_limiter import AdaptiveRateLimiter
+from google.api_core import exceptions as api_exceptions
 
 # Create router
 router = APIRouter()
 
+# Per-key model catalogs, refreshed in the background before they expire
+MODEL_CATALOG = ModelCatalogCache(
+    "gemini_models",
+    ttl_seconds=float(os.environ.get("GEMINI_MODEL_CATALOG_TTL", "3600")),
+    refresh_after_seconds=float(os.environ["GEMINI_MODEL_CATALOG_REFRESH_AFTER"]) if os.environ.get("GEMINI_MODEL_CATALOG_REFRESH_AFTER") else None,
+    max_entries=int(os.environ.get("GEMINI_MODEL_CATALOG_MAX_ENTRIES", "256")),
+)
+
+# Opt-in cache of deterministic (temperature 0) generations, bounded by entries and bytes
+RESPONSE_CACHE = TieredCache(
+    "gemini_responses",
+    max_entries=int(os.environ.get("GEMINI_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.environ.get("GEMINI_CACHE_TTL", "86400")),
+    sqlite_path=os.environ.get("GEMINI_CACHE_DB") or None,
+    max_bytes=int(os.environ.get("GEMINI_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    max_disk_entries=int(os.environ.get("GEMINI_CACHE_DB_MAX_ENTRIES", "10000")),
+)
+
+# Key validation results, keyed by a salted hash of the key; rejected keys are re-checked sooner
+KEY_HASH_SALT = os.environ.get("GEMINI_KEY_HASH_SALT", "").encode("utf-8") or os.urandom(32)
+KEY_VALIDATION_INVALID_TTL = float(os.environ.get("GEMINI_KEY_VALIDATION_INVALID_TTL", "60"))
+KEY_VALIDATION_CACHE = TieredCache(
+    "gemini_key_validation",
+    max_entries=int(os.environ.get("GEMINI_KEY_VALIDATION_MAX_ENTRIES", "4096")),
+    ttl_seconds=float(os.environ.get("GEMINI_KEY_VALIDATION_TTL", "900")),
+)
+KEY_VALIDATION_FLIGHT = SingleFlight("gemini_key_validation")
+KEY_PROBE_LATENCY = LatencyRecorder("gemini_key_probe_ms")
+
+# Batch generation: bounded size, adaptive per-key pacing that backs off on 429s
+GEMINI_BATCH_MAX_ITEMS = int(os.environ.get("GEMINI_BATCH_MAX_ITEMS", "500"))
+BATCH_RATE_LIMITER = AdaptiveRateLimiter(
+    "gemini_batch",
+    initial_rate=float(os.environ.get("GEMINI_BATCH_INITIAL_RATE", "2")),
+    min_rate=float(os.environ.get("GEMINI_BATCH_MIN_RATE", "0.2")),
+    max_rate=float(os.environ.get("GEMINI_BATCH_MAX_RATE", "10")),
+)
+
+# Streaming generation latency
+TIME_TO_FIRST_TOKEN = LatencyRecorder("gemini_time_to_first_token_ms")
+GENERATION_LATENCY = LatencyRecorder("gemini_stream_total_ms")
+
 # Models
 class GeminiRequest(BaseModel):
     api_key: str = Field(..., description="Gemini API key")
@@ -15,14 +70,43 @@ class GeminiRequest(BaseModel):
     model: str = Field("gemini-pro", description="The Gemini model to use")
     temperature: float = Field(0.7, description="Temperature for generation", ge=0, le=1)
     max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate")
+    use_cache: bool = Field(False, description="Serve identical deterministic requests (temperature 0) from the response cache")
 
 class GeminiResponse(BaseModel):
     text: str
     model: str
     finish_reason: Optional[str] = None
     usage: Optional[Dict[str, Any]] = None
+    cache_status: Optional[str] = Field(None, description="'hit' or 'miss' when the response cache was used, 'bypass' when it was requested but the settings are not deterministic")
     timestamp: float
 
+class GeminiBatchItem(BaseModel):
+    prompt: str = Field(..., description="The prompt to send to Gemini")
+    id: Optional[str] = Field(None, description="Caller's identifier, echoed back on the result (e.g. a lead key)")
+
+class GeminiBatchRequest(BaseModel):
+    api_key: str = Field(..., description="Gemini API key")
+    items: List[GeminiBatchItem] = Field(..., description="Prompts to generate", min_length=1)
+    model: str = Field("gemini-pro", description="The Gemini model to use")
+    temperature: float = Field(0.7, description="Temperature for generation", ge=0, le=1)
+    max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate per prompt")
+    use_cache: bool = Field(False, description="Serve identical deterministic prompts (temperature 0) from the response cache")
+    max_concurrency: int = Field(4, description="Prompts generated at the same time", ge=1, le=16)
+    max_retries: int = Field(3, description="Retries per prompt after Gemini rate limits it", ge=0, le=10)
+
+class GeminiBatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the prompt in the request")
+    id: Optional[str] = None
+    status: str = Field(..., description="'ok', 'rate_limited' (still throttled after max_retries) or 'error'")
+    text: Optional[str] = None
+    model: Optional[str] = None
+    finish_reason: Optional[str] = None
+    cache_status: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int
+    throttled: int = Field(0, description="Attempts rejected with a 429")
+    latency_ms: float
+
 class ValidateKeyRequest(BaseModel):
     api_key: str = Field(..., description="Gemini API key to validate")
 
@@ -32,11 +116,42 @@ class ValidateKeyResponse(BaseModel):
     timestamp: float
 
 # Helper functions
-def configure_gemini(api_key: str):
-    """Configure the Gemini API with the provided API key"""
-    genai.configure(api_key=api_key)
+def api_key_id(api_key: str) -> str:
+    """Stable identifier for an API key that avoids keeping the raw key around"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+async def get_model_catalog(api_key: str) -> ModelCatalog:
+    """Get the cached model catalog for an API key, listing models only when it is missing or expired"""
+    pool = get_gemini_client_pool()
+    return await MODEL_CATALOG.get(
+        api_key_id(api_key),
+        lambda: pool.run_blocking(pool.list_model_names, api_key)
+    )
+
+def salted_key_hash(api_key: str) -> str:
+    """HMAC of an API key, so cached validation results never hold the key or a plain hash of it"""
+    return hmac.new(KEY_HASH_SALT, api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+
+async def probe_api_key(api_key: str) -> Optional[bool]:
+    """Ask Gemini whether it accepts a key; None when the probe failed for another reason"""
+    pool = get_gemini_client_pool()
+    started = time.perf_counter()
+    try:
+        await pool.run_blocking(pool.probe_key, api_key)
+        return True
+    except (api_exceptions.PermissionDenied, api_exceptions.Unauthenticated, api_exceptions.InvalidArgument) as e:
+        print(f"API key rejected: {str(e)}")
+        return False
+    except api_exceptions.ResourceExhausted:
+        # Only an accepted key can run out of quota
+        return True
+    except Exception as e:
+        print(f"API key validation error: {str(e)}")
+        return None
+    finally:
+        KEY_PROBE_LATENCY.record((time.perf_counter() - started) * 1000)
 
-def check_api_key_validity(api_key: str) -> bool:
+async def check_api_key_validity(api_key: str) -> bool:
     """Check if the provided Gemini API key is valid"""
     # Skip validation in development for testing purposes
     # This lets users use the app without a valid API key during development
@@ -48,146 +163,198 @@ def check_api_key_validity(api_key: str) -> bool:
     if api_key.lower() == "test" or api_key.lower() == "testing":
         print("Test API key accepted")
         return True
-        
-    try:
+    
+    key_hash = salted_key_hash(api_key)
+    cached = KEY_VALIDATION_CACHE.get(key_hash)
+    if cached is not None:
+        return cached
+    
+    async def validate() -> bool:
         print(f"Attempting to validate Gemini API key: {api_key[:5]}...")
-        genai.configure(api_key=api_key)
-        # Try a simple model call to test the key
-        generation_config = {
-            "temperature": 0.1,
-            "top_p": 0.95,
-            "top_k": 0,
-            "max_output_tokens": 5,
-        }
-        
-        # Target Gemini 2.0 for validation
-        # Try to get available models list first
+        is_valid = await probe_api_key(api_key)
+        # Transient failures are not cached, so the next attempt probes again
+        if is_valid is not None:
+            KEY_VALIDATION_CACHE.set(key_hash, is_valid, None if is_valid else KEY_VALIDATION_INVALID_TTL)
+        return bool(is_valid)
+    
+    return await KEY_VALIDATION_FLIGHT.do(key_hash, validate)
+
+def build_generation_config(request: GeminiRequest) -> Dict[str, Any]:
+    """Generation config for a request; max_tokens is enforced upstream"""
+    generation_config = {
+        "temperature": request.temperature,
+        "top_p": 0.95,
+        "top_k": 0,
+    }
+    
+    if request.max_tokens is not None:
+        generation_config["max_output_tokens"] = request.max_tokens
+    
+    return generation_config
+
+async def resolve_model_name(api_key: str, requested: str) -> str:
+    """Resolve the requested model against the key's cached catalog, falling back to the default model"""
+    try:
+        model_name = (await get_model_catalog(api_key)).resolve(requested)
+        if requested.replace("models/", "", 1) not in model_name:
+            print(f"Requested model {requested} not available, using {model_name} instead")
+        return model_name
+    except Exception as list_err:
+        print(f"Error listing models: {str(list_err)}")
+        return DEFAULT_MODEL  # Default to newer model
+
+def is_cacheable(request: GeminiRequest) -> bool:
+    """Only deterministic generations are safe to replay from the cache"""
+    return request.use_cache and request.temperature == 0
+
+def response_cache_key(model_name: str, request: GeminiRequest) -> str:
+    """Cache key over the resolved model, whitespace-normalized prompt hash, temperature and max_tokens"""
+    prompt_hash = hashlib.sha256(" ".join(request.prompt.split()).encode("utf-8")).hexdigest()
+    return f"{model_name}|{prompt_hash}|{request.temperature}|{request.max_tokens}"
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether Gemini rejected a call for quota or rate reasons (HTTP 429)"""
+    return isinstance(error, api_exceptions.ResourceExhausted) or "quota exceeded" in str(error).lower() or "429" in str(error)
+
+async def generate_result(request: GeminiRequest, model_name: str) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Generate one response (or serve it from the response cache); returns the response fields and cache status"""
+    # Serve identical deterministic requests from the cache
+    cache_status = None
+    cache_key = None
+    if request.use_cache:
+        cache_status = "bypass"
+        if is_cacheable(request):
+            cache_key = response_cache_key(model_name, request)
+            cached = await RESPONSE_CACHE.aget(cache_key)
+            if cached is not None:
+                return cached, "hit"
+            cache_status = "miss"
+    
+    print(f"Using model: {model_name}")
+    # Initialize the model with this key's own clients
+    model = get_gemini_client_pool().model(request.api_key, model_name, build_generation_config(request))
+    
+    # Generate the response without blocking the event loop
+    with track(UPSTREAM_LATENCY, "gemini", "generate"):
+        response = await model.generate_content_async(request.prompt)
+    
+    # Extract the response text
+    result_text = response.text if hasattr(response, 'text') else str(response)
+    
+    # Construct the response
+    result = {
+        "text": result_text[:2000],  # Truncate overly long responses
+        "model": model_name,  # Return the actual model used, not the requested one
+        "finish_reason": "STOP", # Gemini doesn't provide finish reason in same way as OpenAI
+        "usage": None # Gemini doesn't provide token usage in same way as OpenAI
+    }
+    if cache_key is not None:
+        await RESPONSE_CACHE.aset(cache_key, result)
+    
+    return result, cache_status
+
+async def generate_batch_item(batch: GeminiBatchRequest, index: int, model_name: str) -> GeminiBatchItemResult:
+    """Generate one batch prompt under the adaptive per-key rate, retrying when Gemini throttles"""
+    item = batch.items[index]
+    request = GeminiRequest(
+        api_key=batch.api_key,
+        prompt=item.prompt,
+        model=batch.model,
+        temperature=batch.temperature,
+        max_tokens=batch.max_tokens,
+        use_cache=batch.use_cache
+    )
+    started = time.perf_counter()
+    throttled = 0
+    
+    def ok(result: Dict[str, Any], cache_status: Optional[str]) -> GeminiBatchItemResult:
+        return GeminiBatchItemResult(
+            index=index, id=item.id, status="ok", text=result["text"], model=result["model"],
+            finish_reason=result["finish_reason"], cache_status=cache_status, attempts=throttled + 1,
+            throttled=throttled, latency_ms=(time.perf_counter() - started) * 1000
+        )
+    
+    # Cached responses never reach Gemini, so they do not take a slot from the adaptive rate
+    if is_cacheable(request):
+        cached = await RESPONSE_CACHE.aget(response_cache_key(model_name, request))
+        if cached is not None:
+            return ok(cached, "hit")
+    
+    while True:
+        await BATCH_RATE_LIMITER.acquire(batch.api_key)
         try:
-            models = genai.list_models()
-            model_names = [model.name for model in models]
-            print(f"Available models: {model_names}")
-            
-            # Check for models with full paths
-            if "models/gemini-1.5-flash" in model_names:
-                model_name = "models/gemini-1.5-flash"
-            elif "models/gemini-pro" in model_names:
-                model_name = "models/gemini-pro"
-            # Try Gemini 2.0 models first
-            elif any("gemini-2.0" in name for name in model_names):
-                # Find the first Gemini 2.0 model (non-vision)
-                for name in model_names:
-                    if "gemini-2.0" in name and "vision" not in name:
-                        model_name = name
-                        break
-                else:  # If no Gemini 2.0 model found, try other gemini models
-                    # Find the first gemini model (non-vision)
-                    for name in model_names:
-                        if "models/gemini" in name and "vision" not in name:
-                            model_name = name
-                            break
-                    else:  # If no suitable model found
-                        model_name = model_names[0]  # Use the first available model
-            else:
-                model_name = model_names[0] if model_names else "models/gemini-1.5-flash"  # Use first available or default
-        except Exception as list_err:
-            print(f"Error listing models: {str(list_err)}")
-            model_name = "models/gemini-1.5-flash"  # Default to newer model
-            
-        print(f"Using model: {model_name}")
-        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
-        response = model.generate_content("hello")
-        print("API key validation successful")
-        return True
-    except Exception as e:
-        print(f"API key validation error: {str(e)}")
-        return False
+            result, cache_status = await generate_result(request, model_name)
+        except Exception as e:
+            if not is_quota_error(e):
+                print(f"Gemini batch item {index} failed: {str(e)}")
+                return GeminiBatchItemResult(
+                    index=index, id=item.id, status="error", error=str(e), attempts=throttled + 1,
+                    throttled=throttled, latency_ms=(time.perf_counter() - started) * 1000
+                )
+            BATCH_RATE_LIMITER.on_throttle(batch.api_key)
+            throttled += 1
+            if throttled > batch.max_retries:
+                return GeminiBatchItemResult(
+                    index=index, id=item.id, status="rate_limited", error=str(e), attempts=throttled,
+                    throttled=throttled, latency_ms=(time.perf_counter() - started) * 1000
+                )
+            UPSTREAM_RETRIES.inc("gemini")
+            continue
+        
+        # A hit here means an identical prompt was cached while this one waited for its slot
+        if cache_status != "hit":
+            BATCH_RATE_LIMITER.on_success(batch.api_key)
+        return ok(result, cache_status)
+
+def chunk_text(chunk: Any) -> str:
+    """Text of one streamed chunk; chunks without text parts (e.g. a final safety block) yield ''"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def chunk_finish_reason(chunk: Any) -> Optional[str]:
+    """Finish reason carried by a streamed chunk, if any"""
+    candidates = getattr(chunk, "candidates", None)
+    if candidates and candidates[0].finish_reason:
+        return candidates[0].finish_reason.name
+    return None
+
+def chunk_usage(chunk: Any) -> Optional[Dict[str, Any]]:
+    """Token usage reported on a streamed chunk, if any"""
+    usage = getattr(chunk, "usage_metadata", None)
+    if not usage or not usage.total_token_count:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_token_count,
+        "completion_tokens": usage.candidates_token_count,
+        "total_tokens": usage.total_token_count
+    }
+
+def cancel_upstream(response: Any):
+    """Cancel the gRPC stream behind a streaming response so an abandoned generation stops"""
+    # The SDK keeps the stream call on a private attribute and has no public cancel. If a
+    # release renames it, nothing is cancelled and the stream ends when it is garbage collected.
+    call = getattr(response, "_iterator", None)
+    if call is not None and hasattr(call, "cancel"):
+        call.cancel()
 
 # Endpoints
 @router.post("/generate", response_model=GeminiResponse)
 async def generate_gemini_response(request: GeminiRequest) -> GeminiResponse:
     """Generate a response from Gemini API"""
     try:
-        # Configure Gemini with the provided API key
-        configure_gemini(request.api_key)
-        
-        # Set up the generation config
-        generation_config = {
-            "temperature": request.temperature,
-            "top_p": 0.95,
-            "top_k": 0,
-        }
-        
-        if request.max_tokens is not None:
-            generation_config["max_output_tokens"] = request.max_tokens
-        
-        # Try to get available models list first
-        try:
-            models = genai.list_models()
-            model_names = [model.name for model in models]
-            print(f"Available models: {model_names}")
-            
-            # Check if the requested model is available (with or without prefix)
-            requested_with_prefix = f"models/{request.model}" if not request.model.startswith("models/") else request.model
-            requested_without_prefix = request.model.replace("models/", "") if request.model.startswith("models/") else request.model
-            
-            if requested_with_prefix in model_names:
-                model_name = requested_with_prefix
-            elif any(requested_without_prefix in name for name in model_names):
-                # Find the model containing the requested name
-                for name in model_names:
-                    if requested_without_prefix in name:
-                        model_name = name
-                        break
-            # Fall back to available models - prioritize Gemini 2.0
-            elif any("gemini-2.0" in name for name in model_names):
-                # Find the first Gemini 2.0 model (non-vision)
-                for name in model_names:
-                    if "gemini-2.0" in name and "vision" not in name:
-                        model_name = name
-                        break
-                print(f"Requested model {request.model} not available, using {model_name} instead")
-            elif "models/gemini-1.5-flash" in model_names:
-                model_name = "models/gemini-1.5-flash"
-                print(f"Requested model {request.model} not available, using {model_name} instead")
-            elif any("models/gemini" in name for name in model_names):
-                # Find the first gemini model (non-vision)
-                for name in model_names:
-                    if "models/gemini" in name and "vision" not in name:
-                        model_name = name
-                        break
-                else:
-                    model_name = model_names[0]  # Use the first available model
-                print(f"Requested model {request.model} not available, using {model_name} instead")
-            else:
-                model_name = model_names[0] if model_names else "models/gemini-1.5-flash"  # Use first available or default
-                print(f"Requested model {request.model} not available, using {model_name} instead")
-        except Exception as list_err:
-            print(f"Error listing models: {str(list_err)}")
-            model_name = "models/gemini-1.5-flash"  # Default to newer model
-            
-        print(f"Using model: {model_name}")
-        # Initialize the model
-        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
-        
-        # Generate the response
-        response = model.generate_content(request.prompt)
+        # Resolve the requested model against the cached catalog (requested -> Gemini 2.0 -> 1.5 Flash -> first available)
+        model_name = await resolve_model_name(request.api_key, request.model)
         
-        # Extract the response text
-        result_text = response.text if hasattr(response, 'text') else str(response)
+        result, cache_status = await generate_result(request, model_name)
         
-        # Construct the response
-        return GeminiResponse(
-            text=result_text[:2000],  # Truncate overly long responses
-            model=model_name,  # Return the actual model used, not the requested one
-            finish_reason="STOP", # Gemini doesn't provide finish reason in same way as OpenAI
-            usage=None, # Gemini doesn't provide token usage in same way as OpenAI
-            timestamp=time.time()
-        )
+        return GeminiResponse(**result, cache_status=cache_status, timestamp=time.time())
     
     except Exception as e:
         print(f"Gemini API error: {str(e)}")
         # Special handling for quota exceeded errors
-        if "quota exceeded" in str(e).lower() or "429" in str(e):
+        if is_quota_error(e):
             return GeminiResponse(
                 text="I apologize, but it looks like the Gemini API quota has been exceeded. Please try again later or use a different API key. You can update your API key by clicking on 'New Search' and going through the setup process again.",
                 model=request.model,
@@ -197,11 +364,120 @@ async def generate_gemini_response(request: GeminiRequest) -> GeminiResponse:
             )
         raise HTTPException(status_code=500, detail=f"Error generating Gemini response: {str(e)}") from e
 
+@router.post("/generate-batch", response_class=StreamingResponse)
+async def generate_gemini_batch(request: GeminiBatchRequest, http_request: Request) -> StreamingResponse:
+    """
+    Generate many prompts with one key and stream an `item` frame per prompt as it
+    completes (in completion order, tagged with its index), then a `summary` frame.
+    Prompts run with bounded concurrency and an adaptive per-key rate: each 429 halves
+    the rate and the item is retried, successes slowly raise it again.
+    """
+    if len(request.items) > GEMINI_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {GEMINI_BATCH_MAX_ITEMS} prompts")
+    
+    async def frames():
+        started = time.perf_counter()
+        model_name = await resolve_model_name(request.api_key, request.model)
+        pending: asyncio.Queue = asyncio.Queue()
+        for index in range(len(request.items)):
+            pending.put_nowait(index)
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            while True:
+                try:
+                    index = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await results.put(await generate_batch_item(request, index, model_name))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(request.max_concurrency, len(request.items)))]
+        counts: Dict[str, int] = {}
+        throttled = 0
+        try:
+            for _ in range(len(request.items)):
+                item = await results.get()
+                counts[item.status] = counts.get(item.status, 0) + 1
+                throttled += item.throttled
+                yield "item", item.model_dump()
+                if await http_request.is_disconnected():
+                    print("Client disconnected, cancelling Gemini batch")
+                    return
+        finally:
+            for task in workers:
+                task.cancel()
+        
+        yield "summary", {
+            "model": model_name,
+            "total": len(request.items),
+            "statuses": counts,
+            "throttled_attempts": throttled,
+            "final_rate_per_second": BATCH_RATE_LIMITER.rate(request.api_key),
+            "total_ms": (time.perf_counter() - started) * 1000,
+            "timestamp": time.time()
+        }
+    
+    return stream_frames(http_request, frames())
+
+@router.post("/generate-stream", response_class=StreamingResponse)
+async def stream_gemini_response(request: GeminiRequest, http_request: Request) -> StreamingResponse:
+    """
+    Stream a Gemini response as server-sent events: `chunk` events carry text as it is
+    generated and a final `done` event carries the model, finish reason, usage and latency.
+    max_tokens is enforced by Gemini, and generation stops if the client disconnects.
+    """
+    async def frames():
+        started = time.perf_counter()
+        model_name = await resolve_model_name(request.api_key, request.model)
+        model = get_gemini_client_pool().model(request.api_key, model_name, build_generation_config(request))
+        
+        response = await model.generate_content_async(request.prompt, stream=True)
+        first_token_ms = None
+        finish_reason = None
+        usage = None
+        completed = False
+        try:
+            async for chunk in response:
+                if await http_request.is_disconnected():
+                    print("Client disconnected, cancelling Gemini stream")
+                    break
+                
+                text = chunk_text(chunk)
+                if text and first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                    TIME_TO_FIRST_TOKEN.record(first_token_ms)
+                finish_reason = chunk_finish_reason(chunk) or finish_reason
+                usage = chunk_usage(chunk) or usage
+                if text:
+                    yield "chunk", {"text": text}
+            else:
+                completed = True
+        finally:
+            if not completed:
+                cancel_upstream(response)
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, "gemini", "generate_stream", "ok" if completed else "incomplete")
+        
+        if not completed:
+            return
+        
+        total_ms = (time.perf_counter() - started) * 1000
+        GENERATION_LATENCY.record(total_ms)
+        yield "done", {
+            "model": model_name,
+            "finish_reason": finish_reason,
+            "usage": usage,
+            "time_to_first_token_ms": first_token_ms,
+            "total_ms": total_ms,
+            "timestamp": time.time()
+        }
+    
+    return stream_frames(http_request, frames(), sse=True)
+
 @router.post("/validate-key", response_model=ValidateKeyResponse)
 async def validate_gemini_api_key(request: ValidateKeyRequest) -> ValidateKeyResponse:
     """Validate a Gemini API key"""
     try:
-        is_valid = check_api_key_validity(request.api_key)
+        is_valid = await check_api_key_validity(request.api_key)
         
         message = "API key is valid" if is_valid else "Invalid API key"
         
@@ -218,3 +494,21 @@ async def validate_gemini_api_key(request: ValidateKeyRequest) -> ValidateKeyRes
             message=f"Error validating API key: {str(e)}",
             timestamp=time.time()
         )
+
+@router.get("/gemini-stats")
+def get_gemini_stats() -> Dict[str, Any]:
+    """Get model catalog cache and request coalescing counters for the Gemini integration"""
+    return {
+        "model_catalog": MODEL_CATALOG.stats(),
+        "client_pool": get_gemini_client_pool().stats(),
+        "response_cache": RESPONSE_CACHE.stats(),
+        "key_validation": {
+            "cache": KEY_VALIDATION_CACHE.stats(),
+            "singleflight": KEY_VALIDATION_FLIGHT.stats(),
+            "probe_latency": KEY_PROBE_LATENCY.stats(),
+        },
+        "batch_rate_limiter": BATCH_RATE_LIMITER.stats(),
+        "time_to_first_token": TIME_TO_FIRST_TOKEN.stats(),
+        "stream_latency": GENERATION_LATENCY.stats(),
+        "timestamp": time.time()
+    }
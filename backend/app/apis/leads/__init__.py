@@ -0,0 +1,333 @@
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any
+import asyncio
+import os
+import time
+from app.apis.serper import BusinessData
+from app.apis.gemini import GeminiRequest, resolve_model_name, generate_result, is_quota_error
+from app.libs.lead_store import get_lead_store, SORT_COLUMNS
+from app.libs.geo_index import get_geo_index
+from app.libs.lead_context import build_lead_context
+from app.libs.opportunity_scoring import get_scoring_profile
+
+# Create router
+router = APIRouter()
+
+# Default size of the lead table sent to Gemini with a question
+LEAD_CONTEXT_TOKEN_BUDGET = int(os.environ.get("LEAD_CONTEXT_TOKEN_BUDGET", "4000"))
+
+ASK_LEADS_PROMPT = """You are helping a web development agency review local business leads{where}.
+The leads are listed below as a table, one per line, highest opportunity score first{coverage}. Empty cells are unknown.
+
+{table}
+
+Answer using only these leads. Question: {question}"""
+
+# Models
+class StoredLead(BaseModel):
+    lead_key: str = Field(..., description="Stable lead identifier (place ID, CID or name/address hash)")
+    business: BusinessData
+    location: Optional[str] = Field(None, description="Normalized location of the search that last found this lead")
+    opportunity_score: Optional[float] = Field(None, description="Most recent opportunity score from /analyze, if any")
+    first_seen: float
+    last_seen: float
+
+class LeadQueryResponse(BaseModel):
+    leads: List[StoredLead]
+    total_count: int = Field(..., description="Number of stored leads matching the filters")
+    limit: int
+    offset: int
+    timestamp: float
+
+class NearbyLead(StoredLead):
+    distance_km: float = Field(..., description="Great-circle distance from the query point")
+
+class NearbyLeadsResponse(BaseModel):
+    leads: List[NearbyLead]
+    total_count: int = Field(..., description="Number of stored leads within the radius")
+    timestamp: float
+
+class BoundsLeadsResponse(BaseModel):
+    leads: List[StoredLead]
+    total_count: int = Field(..., description="Number of stored leads inside the bounding box")
+    timestamp: float
+
+class LeadCluster(BaseModel):
+    latitude: float = Field(..., description="Centroid latitude of the clustered leads")
+    longitude: float = Field(..., description="Centroid longitude of the clustered leads")
+    count: int
+    businesses_without_website: int
+    avg_opportunity_score: Optional[float] = None
+    lead_key: Optional[str] = Field(None, description="Set when the cluster holds a single lead")
+
+class LeadClusterResponse(BaseModel):
+    clusters: List[LeadCluster]
+    total_count: int = Field(..., description="Number of stored leads inside the bounding box")
+    timestamp: float
+
+class LeadContextResponse(BaseModel):
+    result_set_id: str
+    kind: str = Field(..., description="'search' or 'analysis'")
+    location: Optional[str] = None
+    context: str = Field(..., description="Compact table of the included leads")
+    columns: List[str]
+    leads_included: int
+    leads_total: int
+    truncated_by_budget: bool = Field(..., description="Whether the token budget cut the table before top_k leads")
+    context_tokens: int = Field(..., description="Estimated tokens in the table (4 characters per token)")
+    naive_tokens: int = Field(..., description="Estimated tokens for the whole result set as indented JSON")
+    tokens_saved: int
+    savings_percent: float
+    timestamp: float
+
+class AskLeadsRequest(BaseModel):
+    api_key: str = Field(..., description="Gemini API key")
+    result_set_id: str = Field(..., description="result_set_id returned by a search or analysis")
+    question: str = Field(..., description="Question about the leads", min_length=1, max_length=2000)
+    model: str = Field("gemini-pro", description="The Gemini model to use")
+    temperature: float = Field(0.3, description="Temperature for generation", ge=0, le=1)
+    max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate")
+    top_k: int = Field(50, description="Include at most this many leads, highest opportunity score first", ge=1, le=500)
+    token_budget: Optional[int] = Field(None, description="Token budget for the lead table (defaults to LEAD_CONTEXT_TOKEN_BUDGET)", ge=100, le=100000)
+    include_reasons: bool = Field(True, description="Add each lead's scoring reasons for analysis result sets")
+
+class AskLeadsResponse(BaseModel):
+    answer: str
+    model: str
+    result_set_id: str
+    leads_included: int
+    leads_total: int
+    context_tokens: int
+    naive_tokens: int
+    tokens_saved: int
+    savings_percent: float
+    timestamp: float
+
+# Helper functions
+async def load_lead_context(result_set_id: str, top_k: int, token_budget: Optional[int], include_reasons: bool):
+    """Build the compact lead table for a saved result set; 404 when it is unknown or expired"""
+    store = get_lead_store()
+    result_set = await asyncio.to_thread(store.get_result_set, result_set_id)
+    if result_set is None:
+        raise HTTPException(status_code=404, detail=f"Result set '{result_set_id}' not found or expired")
+    
+    keys = [key for key, _ in result_set["entries"]]
+    score_by_key = dict(result_set["entries"])
+    leads = await asyncio.to_thread(store.get_leads, keys)
+    
+    explain_reasons = None
+    if include_reasons and result_set["score_profile"]:
+        try:
+            profile = get_scoring_profile(result_set["score_profile"])
+            explain_reasons = lambda business: profile.explain(BusinessData(**business))[0]
+        except KeyError:
+            print(f"Scoring profile {result_set['score_profile']} no longer exists, omitting reasons")
+    
+    context = build_lead_context(
+        [lead["business"] for lead in leads],
+        [score_by_key[lead["lead_key"]] for lead in leads],
+        top_k=top_k,
+        token_budget=token_budget or LEAD_CONTEXT_TOKEN_BUDGET,
+        reasons=explain_reasons
+    )
+    return result_set, context
+
+def check_bounds(south: float, north: float):
+    """Reject boxes whose south edge is above the north edge"""
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must not be greater than north")
+
+# Endpoints
+@router.get("/leads", response_model=LeadQueryResponse)
+async def query_leads(
+    location: Optional[str] = Query(None, description="Only leads found when searching this location"),
+    category: Optional[str] = Query(None, description="Only leads in this category (case-insensitive)"),
+    has_website: Optional[bool] = Query(None, description="Only leads with (true) or without (false) a website"),
+    min_score: Optional[float] = Query(None, description="Minimum stored opportunity score", ge=0, le=100),
+    min_rating: Optional[float] = Query(None, description="Minimum Google rating", ge=0, le=5),
+    max_rating: Optional[float] = Query(None, description="Maximum Google rating", ge=0, le=5),
+    sort_by: str = Query("opportunity_score", description=f"Sort column: {', '.join(SORT_COLUMNS)}"),
+    descending: bool = Query(True, description="Sort in descending order"),
+    limit: int = Query(100, description="Maximum number of leads to return", ge=1, le=1000),
+    offset: int = Query(0, description="Number of leads to skip", ge=0)
+) -> LeadQueryResponse:
+    """Query every lead stored from previous searches, filtered and sorted via indexes without calling Serper"""
+    if sort_by not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort_by}'. Choose one of: {', '.join(SORT_COLUMNS)}")
+
+    try:
+        leads, total = await asyncio.to_thread(
+            get_lead_store().query_leads,
+            location=location,
+            category=category,
+            has_website=has_website,
+            min_score=min_score,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            sort_by=sort_by,
+            descending=descending,
+            limit=limit,
+            offset=offset
+        )
+
+        return LeadQueryResponse(
+            leads=[StoredLead(**lead) for lead in leads],
+            total_count=total,
+            limit=limit,
+            offset=offset,
+            timestamp=time.time()
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying leads: {str(e)}") from e
+
+@router.get("/lead-stats")
+async def get_lead_stats() -> Dict[str, Any]:
+    """Get counts for the persistent lead store"""
+    stats = await asyncio.to_thread(get_lead_store().stats)
+    stats["timestamp"] = time.time()
+    return stats
+
+@router.get("/leads/nearby", response_model=NearbyLeadsResponse)
+async def query_leads_nearby(
+    latitude: float = Query(..., description="Latitude of the center point", ge=-90, le=90),
+    longitude: float = Query(..., description="Longitude of the center point", ge=-180, le=180),
+    radius_km: float = Query(5, description="Search radius in kilometers", gt=0, le=500),
+    has_website: Optional[bool] = Query(None, description="Only leads with (true) or without (false) a website"),
+    min_score: Optional[float] = Query(None, description="Minimum stored opportunity score", ge=0, le=100),
+    limit: int = Query(100, description="Maximum number of leads to return", ge=1, le=1000)
+) -> NearbyLeadsResponse:
+    """Get stored leads within a radius of a point, nearest first"""
+    # The index lookup (and any rebuild) and the lead fetch block, so the whole query runs in a worker thread
+    def run():
+        keys, distances, total = get_geo_index().within_radius(latitude, longitude, radius_km, has_website=has_website, min_score=min_score, limit=limit)
+        distance_by_key = dict(zip(keys, distances))
+        leads = [NearbyLead(**lead, distance_km=distance_by_key[lead["lead_key"]]) for lead in get_lead_store().get_leads(keys)]
+        return leads, total
+
+    try:
+        leads, total = await asyncio.to_thread(run)
+        return NearbyLeadsResponse(leads=leads, total_count=total, timestamp=time.time())
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying nearby leads: {str(e)}") from e
+
+@router.get("/leads/in-bounds", response_model=BoundsLeadsResponse)
+async def query_leads_in_bounds(
+    south: float = Query(..., description="Southern edge latitude", ge=-90, le=90),
+    west: float = Query(..., description="Western edge longitude (greater than east when the box crosses the antimeridian)", ge=-180, le=180),
+    north: float = Query(..., description="Northern edge latitude", ge=-90, le=90),
+    east: float = Query(..., description="Eastern edge longitude", ge=-180, le=180),
+    has_website: Optional[bool] = Query(None, description="Only leads with (true) or without (false) a website"),
+    min_score: Optional[float] = Query(None, description="Minimum stored opportunity score", ge=0, le=100),
+    limit: int = Query(500, description="Maximum number of leads to return", ge=1, le=5000)
+) -> BoundsLeadsResponse:
+    """Get stored leads inside a map viewport, highest opportunity score first"""
+    check_bounds(south, north)
+
+    # Runs in a worker thread, like query_leads_nearby
+    def run():
+        keys, total = get_geo_index().within_bounds(south, west, north, east, has_website=has_website, min_score=min_score, limit=limit)
+        return [StoredLead(**lead) for lead in get_lead_store().get_leads(keys)], total
+
+    try:
+        leads, total = await asyncio.to_thread(run)
+        return BoundsLeadsResponse(leads=leads, total_count=total, timestamp=time.time())
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying leads in bounds: {str(e)}") from e
+
+@router.get("/leads/clusters", response_model=LeadClusterResponse)
+async def query_lead_clusters(
+    south: float = Query(..., description="Southern edge latitude", ge=-90, le=90),
+    west: float = Query(..., description="Western edge longitude (greater than east when the box crosses the antimeridian)", ge=-180, le=180),
+    north: float = Query(..., description="Northern edge latitude", ge=-90, le=90),
+    east: float = Query(..., description="Eastern edge longitude", ge=-180, le=180),
+    zoom: int = Query(..., description="Map zoom level; clusters get smaller as zoom increases", ge=0, le=22),
+    has_website: Optional[bool] = Query(None, description="Only leads with (true) or without (false) a website"),
+    min_score: Optional[float] = Query(None, description="Minimum stored opportunity score", ge=0, le=100)
+) -> LeadClusterResponse:
+    """Cluster the stored leads in a map viewport for zoomed-out views"""
+    check_bounds(south, north)
+
+    try:
+        clusters = await asyncio.to_thread(lambda: get_geo_index().clusters(south, west, north, east, zoom, has_website=has_website, min_score=min_score))
+        return LeadClusterResponse(
+            clusters=[LeadCluster(**cluster) for cluster in clusters],
+            total_count=sum(cluster["count"] for cluster in clusters),
+            timestamp=time.time()
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error clustering leads: {str(e)}") from e
+
+@router.get("/leads/result-sets/{result_set_id}/context", response_model=LeadContextResponse)
+async def get_lead_context(
+    result_set_id: str,
+    top_k: int = Query(50, description="Include at most this many leads, highest opportunity score first", ge=1, le=500),
+    token_budget: Optional[int] = Query(None, description="Token budget for the table (defaults to LEAD_CONTEXT_TOKEN_BUDGET)", ge=100, le=100000),
+    include_reasons: bool = Query(True, description="Add each lead's scoring reasons for analysis result sets")
+) -> LeadContextResponse:
+    """Preview the compact lead table /leads/ask would send to Gemini, with token savings against raw JSON"""
+    result_set, context = await load_lead_context(result_set_id, top_k, token_budget, include_reasons)
+    
+    return LeadContextResponse(
+        result_set_id=result_set_id,
+        kind=result_set["kind"],
+        location=result_set["location"],
+        context=context["text"],
+        columns=context["columns"],
+        leads_included=context["included"],
+        leads_total=context["total"],
+        truncated_by_budget=context["truncated_by_budget"],
+        context_tokens=context["context_tokens"],
+        naive_tokens=context["naive_tokens"],
+        tokens_saved=context["tokens_saved"],
+        savings_percent=context["savings_percent"],
+        timestamp=time.time()
+    )
+
+@router.post("/leads/ask", response_model=AskLeadsResponse)
+async def ask_about_leads(request: AskLeadsRequest) -> AskLeadsResponse:
+    """Ask Gemini a question about a saved search or analysis, sending a compact, token-budgeted lead table instead of raw JSON"""
+    result_set, context = await load_lead_context(request.result_set_id, request.top_k, request.token_budget, request.include_reasons)
+    if not context["included"]:
+        raise HTTPException(status_code=400, detail="The result set has no leads to ask about")
+    
+    location = result_set["location"]
+    prompt = ASK_LEADS_PROMPT.format(
+        where=f" in {location}" if location else "",
+        coverage=f" ({context['included']} of {context['total']} leads)" if context["included"] < context["total"] else "",
+        table=context["text"],
+        question=request.question
+    )
+    
+    try:
+        gemini_request = GeminiRequest(
+            api_key=request.api_key,
+            prompt=prompt,
+            model=request.model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens
+        )
+        model_name = await resolve_model_name(request.api_key, request.model)
+        result, _ = await generate_result(gemini_request, model_name)
+    except Exception as e:
+        print(f"Gemini API error: {str(e)}")
+        if is_quota_error(e):
+            raise HTTPException(status_code=429, detail="The Gemini API quota has been exceeded. Please try again later.") from e
+        raise HTTPException(status_code=500, detail=f"Error generating Gemini response: {str(e)}") from e
+    
+    return AskLeadsResponse(
+        answer=result["text"],
+        model=result["model"],
+        result_set_id=request.result_set_id,
+        leads_included=context["included"],
+        leads_total=context["total"],
+        context_tokens=context["context_tokens"],
+        naive_tokens=context["naive_tokens"],
+        tokens_saved=context["tokens_saved"],
+        savings_percent=context["savings_percent"],
+        timestamp=time.time()
+    )
@@ -1,30 +1,76 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from fastapi import APIRouter, HTTPException, Request, BackgroundTasks, Depends, Query
-from pydantic import BaseModel, Field
-import http.client
-import json
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+import asyncio
+import os
+import httpx
 import databutton as db
 from tenacity import retry, stop_after_attempt, wait_exponential
 import time
+from app.libs.serper_client import get_serper_client
+from app.libs.cache import TieredCache
+from app.libs.singleflight import SingleFlight
+from app.libs.rate_limiter import TokenBucketLimiter, DEFAULT_RATE_LIMIT_DB
+from app.libs.streaming import stream_frames
+from app.libs.business_stats import BusinessStatsAccumulator
+from app.libs.lead_store import get_lead_store, lead_key
+from app.libs.dedupe import dedupe_businesses
+from app.libs.metrics import UPSTREAM_LATENCY, track, record_retry
 
 # Get the API key
 SERPER_API_KEY = db.secrets.get("SERPER_API_KEY")
-# Not needed with http.client approach
 
 # Create router
 router = APIRouter()
 
-# Rate limiter
-LAST_REQUEST_TIME = 0
-MIN_REQUEST_INTERVAL = 1  # 1 second between requests
+# Rate limiter (token bucket per API key, shared by every worker on the host)
+RATE_LIMITER = TokenBucketLimiter(
+    "serper",
+    rate_per_second=float(os.environ.get("SERPER_RATE_LIMIT_PER_SECOND", "5")),
+    burst=float(os.environ.get("SERPER_RATE_LIMIT_BURST", "10")),
+    sqlite_path=os.environ.get("RATE_LIMIT_DB", DEFAULT_RATE_LIMIT_DB) or None,
+)
+
+# Query result cache (memory LRU tier, plus SQLite tier when SERPER_CACHE_DB is set)
+SEARCH_CACHE = TieredCache(
+    "serper_places",
+    max_entries=int(os.environ.get("SERPER_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=float(os.environ.get("SERPER_CACHE_TTL", "3600")),
+    sqlite_path=os.environ.get("SERPER_CACHE_DB") or None,
+    max_disk_entries=int(os.environ.get("SERPER_CACHE_DB_MAX_ENTRIES", "10000")),
+)
+
+# Identical concurrent searches share one upstream call
+SEARCH_FLIGHT = SingleFlight("serper_places")
+
+# Paged search settings
+SINGLE_PAGE_MAX_RESULTS = 100
+PAGED_MAX_RESULTS = 2000
+SERPER_MAX_PAGES = int(os.environ.get("SERPER_MAX_PAGES", "100"))
+SERPER_PAGE_CONCURRENCY = int(os.environ.get("SERPER_PAGE_CONCURRENCY", "4"))
+
+# Batch search settings
+MAX_BATCH_QUERIES = int(os.environ.get("SERPER_MAX_BATCH_QUERIES", "200"))
+
+# Streamed results are written to the lead store in chunks of this size
+LEAD_STORE_CHUNK_SIZE = 100
 
 # Models
 class BusinessFilterRequest(BaseModel):
     location: str = Field(..., description="Location to search for businesses (e.g. 'Lethbridge, Alberta')")
     category: Optional[str] = Field(None, description="Optional category to filter businesses (e.g. 'restaurants', 'cafes')")
-    max_results: Optional[int] = Field(100, description="Maximum number of results to return", ge=1, le=100)
+    max_results: Optional[int] = Field(100, description="Maximum number of results to return (up to 100, or 2000 with paginate)", ge=1, le=PAGED_MAX_RESULTS)
     filter_no_website: Optional[bool] = Field(False, description="Filter to only include businesses with no website")
     max_rating: Optional[float] = Field(None, description="Filter to only include businesses with rating below this value", ge=0, le=5)
+    bypass_cache: Optional[bool] = Field(False, description="Skip the query cache and fetch fresh results from Serper")
+    paginate: Optional[bool] = Field(False, description="Fetch multiple Serper result pages concurrently until max_results is reached")
+
+    @model_validator(mode="after")
+    def check_max_results(self):
+        if not self.paginate and self.max_results is not None and self.max_results > SINGLE_PAGE_MAX_RESULTS:
+            raise ValueError(f"max_results above {SINGLE_PAGE_MAX_RESULTS} requires paginate=true")
+        return self
 
 class BusinessContact(BaseModel):
     phone: Optional[str] = None
@@ -46,69 +92,239 @@ class BusinessData(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     price_level: Optional[str] = None
+    place_id: Optional[str] = None
+    cid: Optional[str] = None
 
 class BusinessSearchResponse(BaseModel):
     businesses: List[BusinessData]
     total_count: int
+    duplicates_merged: int = Field(0, description="Number of duplicate records merged into other results")
+    result_set_id: Optional[str] = Field(None, description="Id of the saved result set, for asking about these results later")
     timestamp: float
 
-# Helper functions
-def rate_limit():
-    """Simple rate limiter to prevent too many requests"""
-    global LAST_REQUEST_TIME
-    current_time = time.time()
-    time_since_last_request = current_time - LAST_REQUEST_TIME
-    
-    if time_since_last_request < MIN_REQUEST_INTERVAL:
-        time.sleep(MIN_REQUEST_INTERVAL - time_since_last_request)
-    
-    LAST_REQUEST_TIME = time.time()
+class BatchSearchRequest(BaseModel):
+    locations: List[str] = Field(..., description="Locations to search (e.g. ['Lethbridge, Alberta', 'Red Deer, Alberta'])", min_length=1)
+    categories: Optional[List[str]] = Field(None, description="Categories to search in every location; omit to search all businesses")
+    max_results_per_query: Optional[int] = Field(100, description="Maximum number of results per location/category query", ge=1, le=PAGED_MAX_RESULTS)
+    filter_no_website: Optional[bool] = Field(False, description="Filter to only include businesses with no website")
+    max_rating: Optional[float] = Field(None, description="Filter to only include businesses with rating below this value", ge=0, le=5)
+    bypass_cache: Optional[bool] = Field(False, description="Skip the query cache and fetch fresh results from Serper")
+    paginate: Optional[bool] = Field(False, description="Fetch multiple Serper result pages per query")
+    max_concurrency: Optional[int] = Field(4, description="Maximum number of queries to run at the same time", ge=1, le=16)
+
+    @model_validator(mode="after")
+    def check_batch_size(self):
+        query_count = len(self.locations) * max(1, len(self.categories or []))
+        if query_count > MAX_BATCH_QUERIES:
+            raise ValueError(f"Batch of {query_count} queries exceeds the limit of {MAX_BATCH_QUERIES}")
+        if not self.paginate and self.max_results_per_query is not None and self.max_results_per_query > SINGLE_PAGE_MAX_RESULTS:
+            raise ValueError(f"max_results_per_query above {SINGLE_PAGE_MAX_RESULTS} requires paginate=true")
+        return self
+
+class BatchQueryResult(BaseModel):
+    location: str
+    category: Optional[str] = None
+    query: str
+    status: str = Field(..., description="'ok' or 'error'")
+    result_count: int = 0
+    error: Optional[str] = None
+    duration_ms: float
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
-def search_businesses(query: str) -> Dict[str, Any]:
+class BatchSearchResponse(BaseModel):
+    businesses: List[BusinessData]
+    total_count: int
+    queries: List[BatchQueryResult]
+    succeeded: int
+    failed: int
+    duplicates_merged: int = Field(0, description="Number of duplicate records merged across and within queries")
+    result_set_id: Optional[str] = Field(None, description="Id of the saved result set, for asking about these results later")
+    timestamp: float
+
+# Helper functions
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10), before_sleep=record_retry("serper"))
+async def search_businesses(query: str, page: int = 1) -> Dict[str, Any]:
     """Search for businesses using Serper API with retry logic"""
-    rate_limit()  # Apply rate limiting
+    await RATE_LIMITER.acquire(SERPER_API_KEY or "default")  # Apply rate limiting
     
     try:
         # Use the dedicated places endpoint which provides more detailed local business information
-        conn = http.client.HTTPSConnection("google.serper.dev")
-        
-        # URL encode the query
-        # Format: /places?q=query&apiKey=key
-        encoded_query = query.replace(" ", "+")
-        endpoint = f"/places?q={encoded_query}&apiKey={SERPER_API_KEY}"
-        
-        # Make the request
-        conn.request("GET", endpoint, "", {})
-        response = conn.getresponse()
-        data = response.read()
-        
-        if response.status != 200:
-            raise HTTPException(status_code=response.status, detail=f"Serper API error: {data.decode('utf-8')}")
+        # Format: /places?q=query&apiKey=key (the shared client keeps connections alive between calls)
+        client = get_serper_client()
+        params = {"q": query, "apiKey": SERPER_API_KEY}
+        if page > 1:
+            params["page"] = page
+        with track(UPSTREAM_LATENCY, "serper", "places"):
+            response = await client.get("/places", params=params)
+            
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail=f"Serper API error: {response.text}")
         
-        return json.loads(data.decode("utf-8"))
-    except http.client.HTTPException as e:
+        return response.json()
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"HTTP connection error: {str(e)}") from e
+
+def cache_key(query: str, page: int = 1) -> str:
+    """Normalize a query so equivalent searches share a cache entry"""
+    key = " ".join(query.lower().split())
+    return key if page == 1 else f"{key}#page={page}"
+
+async def search_businesses_cached(query: str, bypass_cache: bool = False, page: int = 1) -> Dict[str, Any]:
+    """Search for businesses, serving repeated queries from the query cache"""
+    key = cache_key(query, page)
+    
+    if not bypass_cache:
+        cached = await SEARCH_CACHE.aget(key)
+        if cached is not None:
+            print(f"Cache hit for: {query}")
+            return cached
+    
+    async def fetch_and_store() -> Dict[str, Any]:
+        search_results = await search_businesses(query, page)
+        await SEARCH_CACHE.aset(key, search_results)
+        return search_results
+    
+    return await SEARCH_FLIGHT.do(key, fetch_and_store)
+
+async def iter_search_pages(query: str, bypass_cache: bool = False, max_pages: int = SERPER_MAX_PAGES, concurrency: int = SERPER_PAGE_CONCURRENCY) -> AsyncIterator[Dict[str, Any]]:
+    """Yield raw Serper result pages as they arrive, keeping up to `concurrency` page requests in flight"""
+    next_page = 1
+    exhausted = False
+    pending = set()
+    
+    try:
+        while pending or (not exhausted and next_page <= max_pages):
+            # Top up the window of in-flight page requests (each one still passes the rate limiter)
+            while not exhausted and next_page <= max_pages and len(pending) < concurrency:
+                pending.add(asyncio.ensure_future(search_businesses_cached(query, bypass_cache=bypass_cache, page=next_page)))
+                next_page += 1
+            
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                search_results = task.result()
+                # An empty page means Serper has no more results for this query
+                if not search_results.get("places"):
+                    exhausted = True
+                yield search_results
+    finally:
+        for task in pending:
+            task.cancel()
+
+def business_identity(business: BusinessData) -> str:
+    """Key used to recognise the same business across result pages and queries"""
+    return lead_key(business)
+
+async def iter_businesses_paged(query: str, max_results: int, filter_no_website: bool = False, max_rating: Optional[float] = None, bypass_cache: bool = False) -> AsyncIterator[BusinessData]:
+    """Yield deduplicated businesses from concurrently fetched pages, stopping once max_results pass the filters"""
+    count = 0
+    seen = set()
+    
+    pages = iter_search_pages(query, bypass_cache=bypass_cache)
+    try:
+        async for search_results in pages:
+            for business in extract_business_data(search_results, max_results, filter_no_website=filter_no_website, max_rating=max_rating):
+                identity = business_identity(business)
+                if identity in seen:
+                    continue
+                seen.add(identity)
+                count += 1
+                yield business
+                if count >= max_results:
+                    break
+            
+            # Stop early once we have enough results after filtering
+            if count >= max_results:
+                break
     finally:
-        if 'conn' in locals():
-            conn.close()
+        await pages.aclose()
+
+# Google Maps URL prefixes, by the identifier each one is built from
+MAPS_PLACE_ID_URL = "https://www.google.com/maps/place/?q=place_id:"
+MAPS_CID_URL = "https://maps.google.com/?cid="
+MAPS_SEARCH_URL = "https://www.google.com/maps/search/"
+
+# Validates a whole extracted page in one pydantic-core call
+BUSINESS_LIST_ADAPTER = TypeAdapter(List[BusinessData])
+
+def business_fields(item: Dict[str, Any], has_website: bool, rating: Optional[float]) -> Dict[str, Any]:
+    """Plain BusinessData field values for one Serper place (validated by the caller)"""
+    get = item.get
+    
+    # Create Google Maps URL from place ID (preferred), cid, or coordinates
+    place_id = get("placeId")
+    cid = get("cid")
+    has_coordinates = "latitude" in item and "longitude" in item
+    if place_id:
+        google_maps_url = MAPS_PLACE_ID_URL + str(place_id)
+    elif cid:
+        google_maps_url = MAPS_CID_URL + str(cid)
+    elif has_coordinates:
+        lat = item["latitude"]
+        lng = item["longitude"]
+        if "title" in item:
+            google_maps_url = f"{MAPS_SEARCH_URL}{item['title'].replace(' ', '+')}/@{lat},{lng},15z/"
+        else:
+            google_maps_url = f"{MAPS_SEARCH_URL}?api=1&query={lat},{lng}"
+    else:
+        google_maps_url = None
+    
+    # Extract latitude and longitude
+    latitude = None
+    longitude = None
+    if has_coordinates:
+        try:
+            latitude = float(item["latitude"])
+            longitude = float(item["longitude"])
+        except (ValueError, TypeError):
+            pass
+    
+    # Extract email and social media links
+    service_options = get("serviceOptions")
+    email = service_options.get("email") if isinstance(service_options, dict) else None
+    social_links = get("socialMedia")
+    social_media = None
+    if isinstance(social_links, dict):
+        social_media = [url for url in social_links.values() if url and isinstance(url, str)] or None
+    
+    return {
+        "name": get("title", "Unknown"),
+        "rating": rating,
+        "reviews_count": get("ratingCount"),
+        "has_website": has_website,
+        "category": get("category"),
+        "contact": {
+            "phone": get("phoneNumber"),
+            "address": get("address"),
+            "website": get("website") if has_website else None,
+        },
+        "google_maps_url": google_maps_url,
+        "image_url": get("thumbnailUrl"),
+        "business_hours": get("workingHours"),
+        "social_media": social_media,
+        "email": email,
+        "latitude": latitude,
+        "longitude": longitude,
+        "price_level": get("priceLevel"),
+        # Keep Google identifiers so results can be deduplicated and stored
+        "place_id": str(place_id) if place_id else None,
+        "cid": str(cid) if cid else None,
+    }
 
 def extract_business_data(search_results: Dict[str, Any], max_results: int, filter_no_website: bool = False, max_rating: Optional[float] = None) -> List[BusinessData]:
     """Extract relevant business data from search results"""
-    businesses = []
-    
     # Check if places results are present
-    if "places" not in search_results or not search_results["places"]:
-        return businesses
+    places = search_results.get("places")
+    if not places:
+        return []
     
-    # Process and filter places results
-    for item in search_results["places"]:
+    # Collect plain field values, then validate them all at once
+    rows = []
+    for item in places:
         # Stop if we've reached the max results
-        if len(businesses) >= max_results:
+        if len(rows) >= max_results:
             break
             
         # Check if the business has a website
-        has_website = "website" in item and bool(item["website"])
+        has_website = bool(item.get("website"))
         
         # Skip if we're filtering for no website and this business has one
         if filter_no_website and has_website:
@@ -125,108 +341,111 @@ def extract_business_data(search_results: Dict[str, Any], max_results: int, filt
             except (ValueError, TypeError):
                 pass
                 
-        # Extract reviews count
-        reviews_count = item.get("ratingCount")
-        
-        # Extract business hours
-        business_hours = None
-        if "workingHours" in item:
-            business_hours = item.get("workingHours")
-            
-        # Extract email
-        email = None
-        if "serviceOptions" in item and isinstance(item["serviceOptions"], dict):
-            email = item["serviceOptions"].get("email")
-        
-        # Extract social media links
-        social_media = []
-        if "socialMedia" in item and isinstance(item["socialMedia"], dict):
-            for platform, url in item["socialMedia"].items():
-                if url and isinstance(url, str):
-                    social_media.append(url)
-        
-        # Create contact info
-        contact = BusinessContact(
-            phone=item.get("phoneNumber"),
-            address=item.get("address"),
-            website=item.get("website") if has_website else None
-        )
-        
-        # Get image URL if available
-        image_url = item.get("thumbnailUrl")
-        
-        # Create Google Maps URL from place ID (preferred) or coordinates
-        google_maps_url = None
-        if "placeId" in item and item.get("placeId"):
-            # This is the standard format for Google Maps place URLs
-            google_maps_url = f"https://www.google.com/maps/place/?q=place_id:{item.get('placeId')}"
-        # Fallback to cid if placeId is not available
-        elif "cid" in item and item.get("cid"):
-            # For cid, we should use a slightly different format
-            google_maps_url = f"https://maps.google.com/?cid={item.get('cid')}"
-        # Final fallback to coordinates
-        elif "latitude" in item and "longitude" in item:
-            lat = item.get("latitude")
-            lng = item.get("longitude")
-            # Use the standard coordinates format
-            google_maps_url = f"https://www.google.com/maps/search/?api=1&query={lat},{lng}"
-            # If we have a title, add it to the URL
-            if "title" in item:
-                title = item.get("title", "Business").replace(" ", "+")
-                google_maps_url = f"https://www.google.com/maps/search/{title}/@{lat},{lng},15z/"
-        
-        # Extract latitude and longitude
-        latitude = None
-        longitude = None
-        if "latitude" in item and "longitude" in item:
-            try:
-                latitude = float(item.get("latitude"))
-                longitude = float(item.get("longitude"))
-            except (ValueError, TypeError):
-                pass
-                
-        # Extract price level
-        price_level = None
-        if "priceLevel" in item:
-            price_level = item.get("priceLevel")
-            
-        # Create business data
-        business = BusinessData(
-            name=item.get("title", "Unknown"),
-            rating=rating,
-            reviews_count=reviews_count,
-            has_website=has_website,
-            category=item.get("category"),
-            contact=contact,
-            google_maps_url=google_maps_url,
-            image_url=image_url,
-            business_hours=business_hours,
-            social_media=social_media if social_media else None,
-            email=email,
-            latitude=latitude,
-            longitude=longitude,
-            price_level=price_level
+        rows.append(business_fields(item, has_website, rating))
+    
+    return BUSINESS_LIST_ADAPTER.validate_python(rows)
+
+def build_search_query(location: str, category: Optional[str] = None) -> str:
+    """Build search query in "Category in location" format"""
+    if category:
+        return f"{category} in {location}"
+    return f"Businesses in {location}"
+
+async def iter_businesses(request: BusinessFilterRequest) -> AsyncIterator[BusinessData]:
+    """Yield the businesses for a filter request as soon as each result page is extracted"""
+    query = build_search_query(request.location, request.category)
+    
+    # Log the query for debugging
+    print(f"Searching for: {query}")
+    
+    if request.paginate:
+        # Fetch pages concurrently and extract them as they arrive
+        pages = iter_businesses_paged(
+            query,
+            request.max_results,
+            filter_no_website=request.filter_no_website,
+            max_rating=request.max_rating,
+            bypass_cache=request.bypass_cache
         )
-        
-        businesses.append(business)
+        try:
+            async for business in pages:
+                yield business
+        finally:
+            await pages.aclose()
+        return
+    
+    # Make search request
+    search_results = await search_businesses_cached(query, bypass_cache=request.bypass_cache)
     
-    return businesses
+    # Extract business data with filters
+    for business in extract_business_data(
+        search_results, 
+        request.max_results,
+        filter_no_website=request.filter_no_website,
+        max_rating=request.max_rating
+    ):
+        yield business
+
+async def find_businesses(request: BusinessFilterRequest) -> List[BusinessData]:
+    """Run the search described by a filter request and return the extracted businesses"""
+    return [business async for business in iter_businesses(request)]
+
+async def search_unique_businesses(request: BusinessFilterRequest) -> Tuple[List[BusinessData], int]:
+    """Run a search and merge duplicate records, returning (businesses, duplicates merged); nothing is stored"""
+    businesses = await find_businesses(request)
+    
+    # Merge records that describe the same place
+    businesses, duplicates_merged = dedupe_businesses(businesses)
+    if duplicates_merged:
+        print(f"Merged {duplicates_merged} duplicate businesses")
+    
+    return businesses, duplicates_merged
+
+async def store_leads(
+    businesses: List[BusinessData],
+    location: str,
+    scores: Optional[List[Optional[float]]] = None,
+    score_profile: Optional[str] = None,
+    score_profile_hash: Optional[str] = None
+) -> bool:
+    """Upsert businesses into the lead store; failures are logged and never fail the search. Returns whether they were stored"""
+    if not businesses:
+        return True
+    try:
+        await asyncio.to_thread(get_lead_store().upsert_businesses, businesses, location, scores, score_profile, score_profile_hash)
+    except Exception as e:
+        print(f"Failed to store {len(businesses)} leads for {location}: {str(e)}")
+        return False
+    return True
+
+async def save_result_set(
+    kind: str,
+    keys: List[str],
+    location: Optional[str] = None,
+    category: Optional[str] = None,
+    scores: Optional[List[float]] = None,
+    score_profile: Optional[str] = None
+) -> Optional[str]:
+    """Save which leads (by lead key) a request returned and return the result set id; failures are logged and return None"""
+    try:
+        return await asyncio.to_thread(get_lead_store().create_result_set, kind, keys, scores, location, category, score_profile)
+    except Exception as e:
+        print(f"Failed to save {kind} result set for {location}: {str(e)}")
+        return None
 
 # Endpoints
 @router.post("/raw-serper-data")
-def get_raw_serper_data(request: BusinessFilterRequest):
+async def get_raw_serper_data(request: BusinessFilterRequest):
     """Get raw data from Serper API for debugging purposes"""
     try:
         # Build search query in "Category in location" format
-        query = f"Businesses in {request.location}"
-        if request.category:
-            query = f"{request.category} in {request.location}"
+        query = build_search_query(request.location, request.category)
         
         # Log the query for debugging
         print(f"Getting raw data for: {query}")
         
         # Make search request
-        search_results = search_businesses(query)
+        search_results = await search_businesses_cached(query, bypass_cache=request.bypass_cache)
         
         # Return the raw data
         return search_results
@@ -235,27 +454,14 @@ def get_raw_serper_data(request: BusinessFilterRequest):
         raise HTTPException(status_code=500, detail=f"Error getting raw Serper data: {str(e)}") from e
 
 @router.post("/search-businesses", response_model=BusinessSearchResponse)
-def search_local_businesses(request: BusinessFilterRequest) -> BusinessSearchResponse:
-    """Search for local businesses based on location and optional category. Supports up to 100 results maximum."""
+async def search_local_businesses(request: BusinessFilterRequest) -> BusinessSearchResponse:
+    """Search for local businesses based on location and optional category. Supports up to 100 results, or 2000 with paginate."""
     try:
-        # Build search query in "Category in location" format
-        query = f"Businesses in {request.location}"
-        if request.category:
-            query = f"{request.category} in {request.location}"
+        businesses, duplicates_merged = await search_unique_businesses(request)
         
-        # Log the query for debugging
-        print(f"Searching for: {query}")
-        
-        # Make search request
-        search_results = search_businesses(query)
-        
-        # Extract business data with filters
-        businesses = extract_business_data(
-            search_results, 
-            request.max_results,
-            filter_no_website=request.filter_no_website,
-            max_rating=request.max_rating
-        )
+        # Keep every result in the lead store for later querying
+        await store_leads(businesses, request.location)
+        result_set_id = await save_result_set("search", [lead_key(b) for b in businesses], request.location, request.category)
         
         # Count total results
         total_count = len(businesses)
@@ -264,8 +470,109 @@ def search_local_businesses(request: BusinessFilterRequest) -> BusinessSearchRes
         return BusinessSearchResponse(
             businesses=businesses,
             total_count=total_count,
+            duplicates_merged=duplicates_merged,
+            result_set_id=result_set_id,
             timestamp=time.time()
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching businesses: {str(e)}") from e
+
+@router.post("/search-businesses/stream", response_class=StreamingResponse)
+async def stream_local_businesses(request: BusinessFilterRequest, http_request: Request) -> StreamingResponse:
+    """Stream businesses as they are extracted (NDJSON, or SSE with Accept: text/event-stream), followed by a summary frame with location and category stats"""
+    async def frames():
+        stats = BusinessStatsAccumulator()
+        pending = []
+        # Only lead keys are kept for the result set, so memory stays bounded by the chunk size
+        streamed_keys = []
+        async for business in iter_businesses(request):
+            stats.add(business)
+            pending.append(business)
+            streamed_keys.append(lead_key(business))
+            if len(pending) >= LEAD_STORE_CHUNK_SIZE:
+                await store_leads(pending, request.location)
+                pending = []
+            yield "business", business.model_dump()
+        await store_leads(pending, request.location)
+        
+        yield "summary", {
+            "total_count": stats.total,
+            "result_set_id": await save_result_set("search", streamed_keys, request.location, request.category),
+            "location_stats": stats.location_stats(),
+            "category_stats": stats.category_stats(),
+            "timestamp": time.time()
+        }
+    
+    return stream_frames(http_request, frames())
+
+@router.post("/search-businesses-batch", response_model=BatchSearchResponse)
+async def search_businesses_batch(request: BatchSearchRequest) -> BatchSearchResponse:
+    """Search every location × category combination server-side with bounded concurrency, merging and deduplicating the results"""
+    categories = request.categories or [None]
+    semaphore = asyncio.Semaphore(request.max_concurrency)
+    
+    async def run_query(location: str, category: Optional[str]):
+        query = build_search_query(location, category)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                businesses = await find_businesses(BusinessFilterRequest(
+                    location=location,
+                    category=category,
+                    max_results=request.max_results_per_query,
+                    filter_no_website=request.filter_no_website,
+                    max_rating=request.max_rating,
+                    bypass_cache=request.bypass_cache,
+                    paginate=request.paginate
+                ))
+                await store_leads(businesses, location)
+                status, error = "ok", None
+            except Exception as e:
+                # Report the failure for this query without failing the whole batch
+                print(f"Batch query failed for {query}: {str(e)}")
+                businesses, status, error = [], "error", str(e)
+        
+        result = BatchQueryResult(
+            location=location,
+            category=category,
+            query=query,
+            status=status,
+            result_count=len(businesses),
+            error=error,
+            duration_ms=(time.perf_counter() - started) * 1000
+        )
+        return result, businesses
+    
+    outcomes = await asyncio.gather(*[
+        run_query(location, category)
+        for location in request.locations
+        for category in categories
+    ])
+    
+    # Merge results in query order, folding duplicates into their first appearance
+    merged, duplicates_merged = dedupe_businesses([business for _, businesses in outcomes for business in businesses])
+    
+    queries = [result for result, _ in outcomes]
+    succeeded = sum(1 for q in queries if q.status == "ok")
+    
+    return BatchSearchResponse(
+        businesses=merged,
+        total_count=len(merged),
+        queries=queries,
+        succeeded=succeeded,
+        failed=len(queries) - succeeded,
+        duplicates_merged=duplicates_merged,
+        result_set_id=await save_result_set("search", [lead_key(b) for b in merged]),
+        timestamp=time.time()
+    )
+
+@router.get("/serper-stats")
+def get_serper_stats() -> Dict[str, Any]:
+    """Get query cache, request coalescing and rate limiter counters for the Serper integration"""
+    return {
+        "cache": SEARCH_CACHE.stats(),
+        "singleflight": SEARCH_FLIGHT.stats(),
+        "rate_limiter": RATE_LIMITER.stats(),
+        "timestamp": time.time()
+    }
@@ -0,0 +1,123 @@
+"""Columnar (NumPy-backed) view of a business result set for analytics.
+
+Usage:
+
+    from app.libs.business_frame import BusinessFrame
+
+    frame = BusinessFrame.from_businesses(businesses)
+    frame.location_stats()   # same shape as business_analysis.analyze_location_stats
+    frame.category_stats()   # same values as business_analysis.analyze_category_stats
+
+Ratings, review counts, website flags, category codes and coordinates are
+held as typed arrays (missing numbers are NaN), so stats are computed with
+vectorized group-by operations instead of Python loops.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from app.libs.business_stats import (
+    RATING_BUCKETS,
+    UNCATEGORIZED,
+    category_stats_from_totals,
+    location_stats_from_totals,
+)
+
+
+class BusinessFrame:
+    """Typed column arrays for a list of BusinessData"""
+
+    def __init__(
+        self,
+        rating: np.ndarray,
+        reviews_count: np.ndarray,
+        has_website: np.ndarray,
+        category_codes: np.ndarray,
+        categories: List[str],
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+    ):
+        self.rating = rating
+        self.reviews_count = reviews_count
+        self.has_website = has_website
+        self.category_codes = category_codes
+        self.categories = categories
+        self.latitude = latitude
+        self.longitude = longitude
+
+    @classmethod
+    def from_businesses(cls, businesses: Iterable[Any]) -> "BusinessFrame":
+        """Build a frame from BusinessData objects (or anything with the same attributes)"""
+        businesses = list(businesses)
+
+        category_index: Dict[str, int] = {}
+        codes = []
+        for business in businesses:
+            category = business.category or UNCATEGORIZED
+            code = category_index.get(category)
+            if code is None:
+                code = category_index[category] = len(category_index)
+            codes.append(code)
+
+        # NumPy turns None into NaN when building float64 arrays
+        return cls(
+            rating=np.array([b.rating for b in businesses], dtype=np.float64),
+            reviews_count=np.array([b.reviews_count for b in businesses], dtype=np.float64),
+            has_website=np.array([b.has_website for b in businesses], dtype=bool),
+            category_codes=np.array(codes, dtype=np.int32),
+            categories=list(category_index),
+            latitude=np.array([b.latitude for b in businesses], dtype=np.float64),
+            longitude=np.array([b.longitude for b in businesses], dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.has_website)
+
+    def location_stats(self) -> Dict[str, Any]:
+        """Website counts, average rating and rating histogram for the whole frame"""
+        total = len(self)
+        with_website = int(np.count_nonzero(self.has_website))
+
+        rated = ~np.isnan(self.rating)
+        ratings = self.rating[rated]
+        # Vectorized business_stats.rating_bucket
+        buckets = np.clip(np.floor(ratings), 0, len(RATING_BUCKETS) - 1).astype(np.int64)
+        histogram = np.bincount(buckets, minlength=len(RATING_BUCKETS))
+
+        return location_stats_from_totals(
+            total, with_website, float(ratings.sum()), len(ratings), [int(count) for count in histogram]
+        )
+
+    def category_stats(self, min_count: int = 2) -> List[Dict[str, Any]]:
+        """Per-category count, average rating, website percentage and opportunity score, best opportunity first"""
+        category_count = len(self.categories)
+        if category_count == 0:
+            return []
+
+        codes = self.category_codes
+        counts = np.bincount(codes, minlength=category_count)
+        with_website = np.bincount(codes, weights=self.has_website, minlength=category_count)
+
+        rated = ~np.isnan(self.rating)
+        rating_counts = np.bincount(codes[rated], minlength=category_count)
+        rating_sums = np.bincount(codes[rated], weights=self.rating[rated], minlength=category_count)
+
+        # The group-bys are the per-business work; the per-category formulas are shared with the accumulator
+        return category_stats_from_totals(
+            (
+                (self.categories[i], int(counts[i]), int(with_website[i]), float(rating_sums[i]), int(rating_counts[i]))
+                for i in range(category_count)
+            ),
+            min_count,
+        )
+
+
+def as_frame(businesses: Any) -> BusinessFrame:
+    """Return `businesses` as a frame, building one from a list if needed"""
+    if isinstance(businesses, BusinessFrame):
+        return businesses
+    return BusinessFrame.from_businesses(businesses)
+
+
+__all__ = ["BusinessFrame", "as_frame"]
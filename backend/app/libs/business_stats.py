@@ -0,0 +1,143 @@
+"""Running location and category statistics for streamed business results.
+
+Usage:
+
+    from app.libs.business_stats import BusinessStatsAccumulator
+
+    stats = BusinessStatsAccumulator()
+    for business in businesses:
+        stats.add(business)
+
+    stats.location_stats()   # same shape as business_analysis.analyze_location_stats
+    stats.category_stats()   # same values as business_analysis.analyze_category_stats
+
+Only counters and sums are kept, so memory stays constant per category no
+matter how many businesses are streamed through. The functions that turn
+those totals into stats dicts are shared with BusinessFrame, which computes
+the same totals with vectorized group-bys.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+RATING_BUCKETS = ["0-1", "1-2", "2-3", "3-4", "4-5"]
+UNCATEGORIZED = "Uncategorized"
+
+
+def rating_bucket(rating: float) -> int:
+    """Index into RATING_BUCKETS: bucket i covers [i, i + 1), so below 1 counts as 0-1 and 4 and up as 4-5"""
+    return min(max(int(rating), 0), len(RATING_BUCKETS) - 1)
+
+
+def location_stats_from_totals(
+    total: int, with_website: int, rating_sum: float, rating_count: int, bucket_counts: Sequence[int]
+) -> Dict[str, Any]:
+    """Location stats from counts and sums; shared by the accumulator and BusinessFrame"""
+    rating_distribution = dict(zip(RATING_BUCKETS, bucket_counts))
+    rating_distribution["no_rating"] = total - rating_count
+    return {
+        "total_businesses": total,
+        "businesses_with_website": with_website,
+        "businesses_without_website": total - with_website,
+        "avg_rating": (rating_sum / rating_count) if rating_count else None,
+        "rating_distribution": rating_distribution,
+        "website_percentage": (with_website / total) * 100 if total else 0,
+    }
+
+
+def category_stats_from_totals(
+    totals: Iterable[Tuple[str, int, int, float, int]], min_count: int = 2
+) -> List[Dict[str, Any]]:
+    """
+    Category stats from (category, count, with_website, rating_sum, rating_count) in first-seen order.
+    Categories with fewer than `min_count` businesses are skipped; best opportunity first.
+    """
+    category_stats = []
+    for category, count, with_website, rating_sum, rating_count in totals:
+        if count < min_count:
+            continue
+
+        website_percentage = (with_website / count) * 100
+        avg_rating: Optional[float] = (rating_sum / rating_count) if rating_count else None
+
+        # Low ratings and low website percentage = more opportunity
+        opp_score = 0.0
+        if avg_rating is not None:
+            opp_score += max(0, 5 - avg_rating) / 5 * 50
+        opp_score += (100 - website_percentage) / 100 * 50
+
+        category_stats.append({
+            "category": category,
+            "count": count,
+            "avg_rating": avg_rating,
+            "website_percentage": website_percentage,
+            "opportunity_score": opp_score,
+        })
+
+    # Stable, so ties keep first-seen order
+    category_stats.sort(key=lambda x: x["opportunity_score"], reverse=True)
+    return category_stats
+
+
+class _CategoryTotals:
+    __slots__ = ("count", "with_website", "rating_sum", "rating_count")
+
+    def __init__(self):
+        self.count = 0
+        self.with_website = 0
+        self.rating_sum = 0.0
+        self.rating_count = 0
+
+
+class BusinessStatsAccumulator:
+    """Accumulate the location and category stats of a result set one business at a time"""
+
+    def __init__(self):
+        self.total = 0
+        self.with_website = 0
+        self.rating_sum = 0.0
+        self.rating_count = 0
+        self.bucket_counts = [0] * len(RATING_BUCKETS)
+        self.categories: Dict[str, _CategoryTotals] = {}
+
+    def add(self, business: Any) -> None:
+        """Fold one BusinessData into the running totals"""
+        self.total += 1
+        if business.has_website:
+            self.with_website += 1
+
+        rating = business.rating
+        if rating is not None:
+            self.rating_sum += rating
+            self.rating_count += 1
+            self.bucket_counts[rating_bucket(rating)] += 1
+
+        category = business.category or UNCATEGORIZED
+        totals = self.categories.get(category)
+        if totals is None:
+            totals = self.categories[category] = _CategoryTotals()
+        totals.count += 1
+        if business.has_website:
+            totals.with_website += 1
+        if rating is not None:
+            totals.rating_sum += rating
+            totals.rating_count += 1
+
+    def location_stats(self) -> Dict[str, Any]:
+        """Location stats in the same shape as analyze_location_stats"""
+        return location_stats_from_totals(self.total, self.with_website, self.rating_sum, self.rating_count, self.bucket_counts)
+
+    def category_stats(self) -> List[Dict[str, Any]]:
+        """Per-category stats (categories with fewer than 2 businesses are skipped), best opportunity first"""
+        return category_stats_from_totals(
+            (category, t.count, t.with_website, t.rating_sum, t.rating_count) for category, t in self.categories.items()
+        )
+
+
+__all__ = [
+    "BusinessStatsAccumulator",
+    "RATING_BUCKETS",
+    "UNCATEGORIZED",
+    "rating_bucket",
+    "location_stats_from_totals",
+    "category_stats_from_totals",
+]
@@ -0,0 +1,266 @@
+"""Tiered TTL/LRU cache with an optional SQLite tier that survives restarts.
+
+Usage:
+
+    from app.libs.cache import TieredCache
+
+    cache = TieredCache("serper_places", max_entries=512, ttl_seconds=3600, sqlite_path="cache.db")
+
+    value = await cache.aget(key)
+    if value is None:
+        value = await fetch()
+        await cache.aset(key, value)
+
+Values must be JSON serializable when the SQLite tier is enabled. Pass
+`max_bytes` to also bound the memory tier by the approximate size of its
+values (UTF-8 length of strings, JSON length of anything else).
+
+The SQLite tier is purged on write, at most once per
+`purge_interval_seconds`. Expired rows are deleted, then the rows of this
+cache beyond `max_disk_entries` that expire soonest.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.libs.metrics import CACHE_LOOKUPS
+
+
+def value_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value, default=str))
+
+
+class TieredCache:
+    """In-memory LRU tier with TTL in front of an optional on-disk SQLite tier"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        sqlite_path: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_disk_entries: int = 10000,
+        purge_interval_seconds: float = 60,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.purge_interval_seconds = purge_interval_seconds
+
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._last_purge = 0.0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.sets = 0
+        self.disk_purged = 0
+
+    # Memory tier
+    def _memory_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, size = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _memory_set(self, key: str, value: Any, expires_at: float) -> None:
+        size = value_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            # Never worth flushing the whole tier for one oversized value
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (expires_at, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    # Disk tier
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.sqlite_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires_at ON cache_entries (expires_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._db_lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.name, key),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                db.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.name, key))
+                db.commit()
+                self.expirations += 1
+                return None
+        return row[1], json.loads(row[0])
+
+    def _disk_set(self, key: str, value: Any, expires_at: float) -> None:
+        payload = json.dumps(value)
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, key, payload, expires_at),
+            )
+            now = time.time()
+            if now - self._last_purge >= self.purge_interval_seconds:
+                self._last_purge = now
+                self._purge(db, now)
+            db.commit()
+
+    def _purge(self, db: sqlite3.Connection, now: float) -> None:
+        """Delete expired rows (of any cache sharing the file), then this cache's rows over max_disk_entries"""
+        purged = db.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,)).rowcount
+        (count,) = db.execute("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.name,)).fetchone()
+        if count > self.max_disk_entries:
+            # Entries share one TTL, so the ones expiring soonest are the oldest writes
+            purged += db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY expires_at LIMIT ?)",
+                (self.name, self.name, count - self.max_disk_entries),
+            ).rowcount
+        self.disk_purged += purged
+
+    # Public API
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, checking memory first and then disk"""
+        value = self._memory_get(key)
+        if value is not None:
+            self.memory_hits += 1
+            CACHE_LOOKUPS.inc(self.name, "hit")
+            return value
+
+        if self.sqlite_path:
+            entry = self._disk_get(key)
+            if entry is not None:
+                expires_at, value = entry
+                self._memory_set(key, value, expires_at)
+                self.disk_hits += 1
+                CACHE_LOOKUPS.inc(self.name, "hit")
+                return value
+
+        self.misses += 1
+        CACHE_LOOKUPS.inc(self.name, "miss")
+        return None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value in every enabled tier"""
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        self._memory_set(key, value, expires_at)
+        if self.sqlite_path:
+            self._disk_set(key, value, expires_at)
+        self.sets += 1
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Async get; only the disk tier is pushed off the event loop"""
+        if not self.sqlite_path:
+            return self.get(key)
+        value = self._memory_get(key)
+        if value is not None:
+            self.memory_hits += 1
+            CACHE_LOOKUPS.inc(self.name, "hit")
+            return value
+        entry = await asyncio.to_thread(self._disk_get, key)
+        if entry is None:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(self.name, "miss")
+            return None
+        expires_at, value = entry
+        self._memory_set(key, value, expires_at)
+        self.disk_hits += 1
+        CACHE_LOOKUPS.inc(self.name, "hit")
+        return value
+
+    async def aset(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Async set; only the disk tier is pushed off the event loop"""
+        if not self.sqlite_path:
+            self.set(key, value, ttl_seconds)
+            return
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        self._memory_set(key, value, expires_at)
+        await asyncio.to_thread(self._disk_set, key, value, expires_at)
+        self.sets += 1
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.sqlite_path:
+            with self._db_lock:
+                db = self._connect()
+                db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.name,))
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for monitoring"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes if self.max_bytes else None,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": bool(self.sqlite_path),
+            "max_disk_entries": self.max_disk_entries if self.sqlite_path else None,
+            "disk_purged": self.disk_purged,
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "sets": self.sets,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+        }
+
+
+__all__ = ["TieredCache"]
@@ -0,0 +1,158 @@
+"""Multi-pattern chain business detector backed by an Aho-Corasick automaton.
+
+Usage:
+
+    from app.libs.chain_matcher import get_chain_matcher
+
+    matcher = get_chain_matcher()
+    matcher.find("McDonald's Restaurant")   # -> "mcdonalds"
+    matcher.matches("Joe's Diner")          # -> False
+
+Brand names are loaded from a dictionary file: UTF-8 text, one brand per
+line, with blank lines and `#` comments ignored. The default is
+`chain_brands.txt` next to this module, which is only a seed list of major
+North American chains. For national and regional coverage, set
+CHAIN_BRANDS_PATH to a larger file in the same format; it replaces the seed
+list rather than extending it. The file is checked for changes at most every
+CHAIN_BRANDS_RELOAD_SECONDS and the automaton is rebuilt when it changes, so
+the dictionary can be edited without a restart.
+
+Names and brands are normalized the same way: accents and apostrophes are
+dropped and other punctuation becomes a space ("McDonald's" -> "mcdonalds",
+"A&W" -> "a w"). Brands only match whole words, so "shell" matches
+"Shell Gas Station" but not "Seashell Spa".
+
+Matching costs one automaton step per character of the name, however many
+brands there are (benchmarks/bench_chain_matcher.py). With the shipped
+dictionary (158 brands) that is about 4 us per name, against about 8 us for
+the old plain substring scan and 12 us for a scan with the same normalization
+and word boundaries. A scan only wins for dictionaries below about 30 brands,
+by around 1 us per name, so there is no separate small-dictionary path.
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_CHAIN_BRANDS_PATH = os.path.join(os.path.dirname(__file__), "chain_brands.txt")
+CHAIN_BRANDS_PATH = os.environ.get("CHAIN_BRANDS_PATH", DEFAULT_CHAIN_BRANDS_PATH)
+CHAIN_BRANDS_RELOAD_SECONDS = float(os.environ.get("CHAIN_BRANDS_RELOAD_SECONDS", "30"))
+
+_APOSTROPHES = re.compile("['’‘`´]")
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and apostrophes, and collapse punctuation to single spaces"""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _SEPARATORS.sub(" ", _APOSTROPHES.sub("", text.lower())).strip()
+
+
+class ChainMatcher:
+    """Aho-Corasick automaton over normalized, space-delimited brand names"""
+
+    def __init__(self, brands: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]
+        self.brand_count = 0
+
+        for brand in brands:
+            normalized = normalize_name(brand)
+            if normalized:
+                self._insert(f" {normalized} ", normalized)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, brand: str) -> None:
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            node = next_node
+        if self._output[node] is None:
+            self._output[node] = brand
+            self.brand_count += 1
+
+    def _build_failure_links(self) -> None:
+        # Breadth-first, so every node's failure target is finished before its children need it
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                # Inherit a match from the longest proper suffix so a single pass finds every brand
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+
+    def find(self, name: str) -> Optional[str]:
+        """Return the first brand found in `name`, or None"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        for ch in f" {normalize_name(name)} ":
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node] is not None:
+                return output[node]
+        return None
+
+    def matches(self, name: str) -> bool:
+        """Whether `name` contains any brand"""
+        return self.find(name) is not None
+
+
+def load_brands(path: str) -> List[str]:
+    """Read brand names from a dictionary file, skipping blank lines and comments"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+_matcher: Optional[ChainMatcher] = None
+_loaded_mtime: Optional[float] = None
+_last_checked = 0.0
+_reload_lock = threading.Lock()
+
+
+def get_chain_matcher() -> ChainMatcher:
+    """Return the shared matcher, rebuilding it if the dictionary file changed"""
+    global _matcher, _loaded_mtime, _last_checked
+
+    now = time.monotonic()
+    if _matcher is not None and now - _last_checked < CHAIN_BRANDS_RELOAD_SECONDS:
+        return _matcher
+
+    with _reload_lock:
+        if _matcher is not None and now - _last_checked < CHAIN_BRANDS_RELOAD_SECONDS:
+            return _matcher
+        _last_checked = now
+        try:
+            mtime = os.path.getmtime(CHAIN_BRANDS_PATH)
+            if _matcher is None or mtime != _loaded_mtime:
+                _matcher = ChainMatcher(load_brands(CHAIN_BRANDS_PATH))
+                _loaded_mtime = mtime
+                print(f"Loaded {_matcher.brand_count} chain brands from {CHAIN_BRANDS_PATH}")
+        except OSError as e:
+            print(f"Failed to load chain brands from {CHAIN_BRANDS_PATH}: {e}")
+            if _matcher is None:
+                _matcher = ChainMatcher([])
+    return _matcher
+
+
+__all__ = ["ChainMatcher", "normalize_name", "load_brands", "get_chain_matcher"]
@@ -0,0 +1,236 @@
+"""Cross-query deduplication of extracted businesses.
+
+Usage:
+
+    from app.libs.dedupe import dedupe_businesses
+
+    unique, merged = dedupe_businesses(businesses)   # merged = records folded into another
+
+Records are grouped in two stages:
+
+1. Exact keys: records sharing a Google placeId or cid are the same place.
+2. Fuzzy matching: records are hashed into blocks (same phone number, same
+   street number + street name, same leading name word in the same ~100 m
+   cell) and only pairs inside a block are compared, so the work grows with
+   the number of records rather than the number of pairs. A pair matches
+   when the names are similar and the phone, address or coordinates agree;
+   a shared name alone never merges two records, so chain locations stay
+   separate.
+
+Each group keeps its earliest record, with missing fields filled in from the
+records merged into it.
+"""
+
+import math
+import re
+from collections import defaultdict
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.libs.chain_matcher import normalize_name
+
+# Blocks bigger than this are too generic to be useful (e.g. a shared switchboard number)
+MAX_BLOCK_SIZE = 50
+
+# Coordinates closer than this are treated as the same storefront
+SAME_PLACE_KM = 0.15
+
+_NAME_STOPWORDS = frozenset({"the", "and", "of", "a", "an", "inc", "ltd", "llc", "co", "corp"})
+
+_NON_DIGITS = re.compile(r"\D+")
+
+_ADDRESS_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "boulevard": "blvd",
+    "lane": "ln", "court": "ct", "place": "pl", "highway": "hwy", "crescent": "cres",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+}
+
+
+class MatchProfile:
+    """Normalized fields of one business used for blocking and comparison"""
+
+    __slots__ = ("place_id", "cid", "name", "tokens", "first_word", "phone", "address", "address_tokens", "street_key", "latitude", "longitude")
+
+    def __init__(self, business: Any):
+        self.place_id = business.place_id
+        self.cid = business.cid
+        self.name = normalize_name(business.name)
+        words = [w for w in self.name.split() if w not in _NAME_STOPWORDS] or self.name.split()
+        self.tokens = frozenset(words)
+        self.first_word = words[0] if words else None
+        self.phone = normalize_phone(business.contact.phone)
+        self.address = normalize_address(business.contact.address)
+        self.address_tokens = frozenset(self.address.split()) if self.address else frozenset()
+        self.street_key = street_key(self.address)
+        self.latitude = business.latitude
+        self.longitude = business.longitude
+
+    def blocking_keys(self) -> List[str]:
+        keys = []
+        if self.phone:
+            keys.append(f"phone:{self.phone}")
+        if self.street_key:
+            keys.append(f"street:{self.street_key}")
+        if self.latitude is not None and self.longitude is not None and self.first_word:
+            keys.append(f"geo:{self.first_word}:{round(self.latitude, 3)}:{round(self.longitude, 3)}")
+        return keys
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Last ten digits of a phone number, or None if it has too few digits to compare"""
+    if not phone:
+        return None
+    digits = _NON_DIGITS.sub("", phone)
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+def normalize_address(address: Optional[str]) -> Optional[str]:
+    """Normalized address with common street words abbreviated ("Main Street" -> "main st")"""
+    if not address:
+        return None
+    return " ".join(_ADDRESS_ABBREVIATIONS.get(word, word) for word in normalize_name(address).split()) or None
+
+
+def street_key(address: Optional[str]) -> Optional[str]:
+    """Street number plus the word after it ("123 main st ..." -> "123 main")"""
+    if not address:
+        return None
+    words = address.split()
+    for i, word in enumerate(words[:-1]):
+        if word[0].isdigit():
+            return f"{word} {words[i + 1]}"
+    return None
+
+
+def name_similarity(a: MatchProfile, b: MatchProfile) -> float:
+    """Token overlap relative to the shorter name, so "Joe's Cafe" matches "Joe's Cafe & Bakery" """
+    if not a.tokens or not b.tokens:
+        return 0.0
+    return len(a.tokens & b.tokens) / min(len(a.tokens), len(b.tokens))
+
+
+def distance_km(a: MatchProfile, b: MatchProfile) -> Optional[float]:
+    """Approximate distance between two profiles, or None when either lacks coordinates"""
+    if a.latitude is None or a.longitude is None or b.latitude is None or b.longitude is None:
+        return None
+    dlat = a.latitude - b.latitude
+    dlon = (a.longitude - b.longitude) * math.cos(math.radians((a.latitude + b.latitude) / 2))
+    return math.hypot(dlat, dlon) * 111.195
+
+
+def is_duplicate(a: MatchProfile, b: MatchProfile) -> bool:
+    """Whether two records describe the same business"""
+    # Distinct Google identifiers are distinct places, however similar they look
+    if (a.place_id and b.place_id and a.place_id != b.place_id) or (a.cid and b.cid and a.cid != b.cid):
+        return False
+
+    similarity = name_similarity(a, b)
+    if similarity < 0.5:
+        return False
+
+    if a.phone and a.phone == b.phone and similarity >= 0.75:
+        return True
+
+    if a.address and b.address:
+        if a.address == b.address and similarity >= 0.6:
+            return True
+        if a.street_key and a.street_key == b.street_key and similarity >= 0.75:
+            overlap = len(a.address_tokens & b.address_tokens) / len(a.address_tokens | b.address_tokens)
+            if overlap >= 0.6:
+                return True
+
+    distance = distance_km(a, b)
+    return distance is not None and distance <= SAME_PLACE_KM and similarity >= 0.8
+
+
+def merge_records(primary: Any, duplicates: Sequence[Any]) -> Any:
+    """Copy of `primary` with empty fields filled from its duplicates"""
+    update: Dict[str, Any] = {}
+    contact_update: Dict[str, Any] = {}
+    for duplicate in duplicates:
+        for field, value in duplicate:
+            if field == "contact" or value is None:
+                continue
+            if getattr(primary, field) is None and field not in update:
+                update[field] = value
+        for field, value in duplicate.contact:
+            if value is not None and getattr(primary.contact, field) is None and field not in contact_update:
+                contact_update[field] = value
+        if duplicate.has_website:
+            update["has_website"] = True
+
+    if contact_update:
+        update["contact"] = primary.contact.model_copy(update=contact_update)
+    return primary.model_copy(update=update) if update else primary
+
+
+def dedupe_businesses(businesses: Sequence[Any]) -> Tuple[List[Any], int]:
+    """Merge duplicate businesses; returns the unique records (in first-seen order) and how many were merged away"""
+    count = len(businesses)
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Google identifiers held by each group, so fuzzy matches never chain two distinct places together
+    group_ids: List[Tuple[Optional[str], Optional[str]]] = [(b.place_id, b.cid) for b in businesses]
+
+    def union(i: int, j: int) -> bool:
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            return True
+        (place_i, cid_i), (place_j, cid_j) = group_ids[root_i], group_ids[root_j]
+        if (place_i and place_j and place_i != place_j) or (cid_i and cid_j and cid_i != cid_j):
+            return False
+        # The earliest record stays the root so it is the one kept
+        root, child = min(root_i, root_j), max(root_i, root_j)
+        parent[child] = root
+        group_ids[root] = (place_i or place_j, cid_i or cid_j)
+        return True
+
+    # Stage 1: exact Google identifiers
+    owners: Dict[str, int] = {}
+    for i, business in enumerate(businesses):
+        for key in (business.place_id and f"place:{business.place_id}", business.cid and f"cid:{business.cid}"):
+            if key:
+                if key in owners:
+                    union(owners[key], i)
+                else:
+                    owners[key] = i
+
+    # Stage 2: fuzzy comparison within hashed blocks
+    profiles = [MatchProfile(business) for business in businesses]
+    blocks: Dict[str, List[int]] = defaultdict(list)
+    for i, profile in enumerate(profiles):
+        for key in profile.blocking_keys():
+            blocks[key].append(i)
+
+    compared: Set[Tuple[int, int]] = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, j in combinations(members, 2):
+            if (i, j) in compared or find(i) == find(j):
+                continue
+            compared.add((i, j))
+            if is_duplicate(profiles[i], profiles[j]):
+                union(i, j)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in range(count):
+        groups[find(i)].append(i)
+
+    unique = []
+    for root in sorted(groups):
+        members = groups[root]
+        primary = businesses[root]
+        unique.append(merge_records(primary, [businesses[i] for i in members[1:]]) if len(members) > 1 else primary)
+
+    return unique, count - len(unique)
+
+
+__all__ = ["dedupe_businesses", "is_duplicate", "merge_records", "normalize_phone", "MatchProfile"]
@@ -0,0 +1,187 @@
+"""Per-API-key Gemini clients that never touch the SDK's global configuration.
+
+Usage:
+
+    from app.libs.gemini_clients import get_gemini_client_pool
+
+    pool = get_gemini_client_pool()
+    model = pool.model(api_key, "models/gemini-1.5-flash", generation_config)
+    response = await model.generate_content_async(prompt)          # per-key async client
+    names = await pool.run_blocking(pool.list_model_names, api_key)  # bounded executor
+    await pool.run_blocking(pool.probe_key, api_key)                 # one-row listing, raises if rejected
+
+`genai.configure()` swaps one process-wide set of clients, so concurrent
+requests with different keys can end up calling Gemini with each other's
+key. Here each key gets its own generative (sync and async) and model
+service clients. They are created on first use, reused across requests, and
+pooled LRU up to GEMINI_CLIENT_POOL_SIZE keys. Models built by `model()`
+have these clients attached, so the SDK never falls back to its globals.
+
+Attaching them sets private GenerativeModel attributes, so google-generativeai
+is pinned in requirements.txt. If a release drops those attributes, `model()`
+logs once, counts it in `stats()["shared_client_fallback"]` and returns the
+model with the SDK's shared client.
+
+Generation should use the async API. Calls with no async form (listing
+models) run on a dedicated executor of GEMINI_SYNC_WORKERS threads, so a
+burst of them cannot take over the default thread pool.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import client_options as client_options_lib
+from google.api_core import gapic_v1
+
+GEMINI_CLIENT_POOL_SIZE = int(os.environ.get("GEMINI_CLIENT_POOL_SIZE", "256"))
+GEMINI_SYNC_WORKERS = int(os.environ.get("GEMINI_SYNC_WORKERS", "8"))
+GEMINI_KEY_PROBE_TIMEOUT = float(os.environ.get("GEMINI_KEY_PROBE_TIMEOUT", "10"))
+
+# Private GenerativeModel attributes holding its clients (google-generativeai 0.8.x)
+_MODEL_CLIENT_ATTRS = ("_client", "_async_client")
+
+# Same user agent the SDK sends from its own clients
+USER_AGENT = f"genai-py/{genai.__version__}"
+
+
+class GeminiClients:
+    """Lazily created service clients bound to one API key"""
+
+    def __init__(self, api_key: str):
+        self._client_options = client_options_lib.ClientOptions(api_key=api_key)
+        self._client_info = gapic_v1.client_info.ClientInfo(user_agent=USER_AGENT)
+        self._lock = threading.Lock()
+        self._generative: Optional[glm.GenerativeServiceClient] = None
+        self._generative_async: Optional[glm.GenerativeServiceAsyncClient] = None
+        self._model_service: Optional[glm.ModelServiceClient] = None
+
+    def _make(self, cls: type) -> Any:
+        return cls(client_options=self._client_options, client_info=self._client_info)
+
+    @property
+    def generative(self) -> glm.GenerativeServiceClient:
+        with self._lock:
+            if self._generative is None:
+                self._generative = self._make(glm.GenerativeServiceClient)
+            return self._generative
+
+    @property
+    def generative_async(self) -> glm.GenerativeServiceAsyncClient:
+        # gRPC asyncio channels belong to the running loop, so this is only created from async code
+        with self._lock:
+            if self._generative_async is None:
+                self._generative_async = self._make(glm.GenerativeServiceAsyncClient)
+            return self._generative_async
+
+    @property
+    def model_service(self) -> glm.ModelServiceClient:
+        with self._lock:
+            if self._model_service is None:
+                self._model_service = self._make(glm.ModelServiceClient)
+            return self._model_service
+
+
+class GeminiClientPool:
+    """LRU pool of per-key clients plus a bounded executor for blocking SDK calls"""
+
+    def __init__(self, max_keys: int = GEMINI_CLIENT_POOL_SIZE, sync_workers: int = GEMINI_SYNC_WORKERS):
+        self.max_keys = max_keys
+        self._clients: "OrderedDict[str, GeminiClients]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=sync_workers, thread_name_prefix="gemini")
+        self.sync_workers = sync_workers
+        self.created = 0
+        self.evicted = 0
+        self.shared_client_fallback = 0
+
+    def clients(self, api_key: str) -> GeminiClients:
+        """Clients for one key, created on first use"""
+        key_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        with self._lock:
+            clients = self._clients.get(key_id)
+            if clients is None:
+                clients = self._clients[key_id] = GeminiClients(api_key)
+                self.created += 1
+                # Evicted clients are not closed: an in-flight request may still hold them, and
+                # their channels close when the last reference goes away
+                while len(self._clients) > self.max_keys:
+                    self._clients.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._clients.move_to_end(key_id)
+            return clients
+
+    def model(self, api_key: str, model_name: str, generation_config: Optional[Dict[str, Any]] = None) -> genai.GenerativeModel:
+        """GenerativeModel wired to this key's clients (call from async code)"""
+        clients = self.clients(api_key)
+        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+        # The SDK only falls back to its global clients when these are unset. They are private,
+        # so if an SDK release renames them the model keeps the SDK's shared client instead.
+        if not all(hasattr(model, attr) for attr in _MODEL_CLIENT_ATTRS):
+            self._warn_shared_client()
+            return model
+        model._client = clients.generative
+        model._async_client = clients.generative_async
+        return model
+
+    def _warn_shared_client(self) -> None:
+        if not self.shared_client_fallback:
+            print(
+                f"google-generativeai {genai.__version__}: GenerativeModel has no {'/'.join(_MODEL_CLIENT_ATTRS)}, "
+                "falling back to the SDK's shared client"
+            )
+        self.shared_client_fallback += 1
+
+    def list_model_names(self, api_key: str) -> List[str]:
+        """Model names available to a key (blocking; use run_blocking)"""
+        return [model.name for model in genai.list_models(client=self.clients(api_key).model_service)]
+
+    def probe_key(self, api_key: str) -> None:
+        """Cheapest authenticated call for a key: one page of one model (blocking; use run_blocking)
+
+        Raises the upstream error (PermissionDenied, InvalidArgument, ...) when the key is rejected.
+        """
+        self.clients(api_key).model_service.list_models(page_size=1, timeout=GEMINI_KEY_PROBE_TIMEOUT)
+
+    async def run_blocking(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking SDK call on the bounded Gemini executor"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters for monitoring"""
+        return {
+            "keys": len(self._clients),
+            "max_keys": self.max_keys,
+            "created": self.created,
+            "evicted": self.evicted,
+            "sync_workers": self.sync_workers,
+            "shared_client_fallback": self.shared_client_fallback,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the executor (used on app shutdown)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[GeminiClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_gemini_client_pool() -> GeminiClientPool:
+    """Return the shared client pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = GeminiClientPool()
+    return _pool
+
+
+__all__ = ["GeminiClients", "GeminiClientPool", "get_gemini_client_pool"]
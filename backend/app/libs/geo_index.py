@@ -0,0 +1,255 @@
+"""In-process spatial index over stored leads for radius, viewport and cluster queries.
+
+Usage:
+
+    from app.libs.geo_index import get_geo_index
+
+    index = get_geo_index()                               # rebuilt when the lead store changes
+    keys, distances, total = index.within_radius(49.69, -112.84, radius_km=5)
+    keys, total = index.within_bounds(south=49.6, west=-113.0, north=49.8, east=-112.7)
+    clusters = index.clusters(south=40, west=-125, north=60, east=-100, zoom=5)
+
+Points are bucketed into a fixed latitude/longitude grid (GEO_INDEX_CELL_DEGREES,
+default 0.05 degrees, roughly 5 km) and stored sorted by cell id. Cells in one
+grid row are contiguous in that order, so a bounding box is answered with one
+binary search per grid row followed by an exact filter on the candidates.
+
+get_geo_index() reads the lead store and may rebuild the index, so API
+handlers call it through asyncio.to_thread. While one thread rebuilds, other
+callers get the previous index instead of waiting.
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.libs.lead_store import get_lead_store
+
+GEO_INDEX_CELL_DEGREES = float(os.environ.get("GEO_INDEX_CELL_DEGREES", "0.05"))
+GEO_INDEX_REFRESH_SECONDS = float(os.environ.get("GEO_INDEX_REFRESH_SECONDS", "5"))
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = EARTH_RADIUS_KM * math.pi / 180
+
+# Cluster cells per map tile; higher means smaller, more numerous clusters
+CLUSTER_CELLS_PER_TILE = 4
+
+
+def haversine_km(lat: float, lon: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes - lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGridIndex:
+    """Immutable grid index over (lead_key, latitude, longitude) points"""
+
+    def __init__(
+        self,
+        keys: List[str],
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        has_website: np.ndarray,
+        opportunity_score: np.ndarray,
+        cell_degrees: float = GEO_INDEX_CELL_DEGREES,
+    ):
+        self.cell_degrees = cell_degrees
+        self.columns = int(math.ceil(360 / cell_degrees))
+        self.rows = int(math.ceil(180 / cell_degrees))
+
+        cell_ids = self._cell_ids(latitude, longitude)
+        order = np.argsort(cell_ids, kind="stable")
+        self.cell_ids = cell_ids[order]
+        self.keys = np.array(keys, dtype=object)[order] if keys else np.array([], dtype=object)
+        self.latitude = latitude[order]
+        self.longitude = longitude[order]
+        self.has_website = has_website[order]
+        self.opportunity_score = opportunity_score[order]
+
+    @classmethod
+    def from_points(cls, points: List[Tuple[str, float, float, int, Optional[float]]], cell_degrees: float = GEO_INDEX_CELL_DEGREES) -> "GeoGridIndex":
+        """Build an index from LeadStore.points() rows"""
+        if not points:
+            empty = np.array([], dtype=np.float64)
+            return cls([], empty, empty, np.array([], dtype=bool), empty, cell_degrees)
+        keys, latitude, longitude, has_website, scores = zip(*points)
+        return cls(
+            list(keys),
+            np.array(latitude, dtype=np.float64),
+            np.array(longitude, dtype=np.float64),
+            np.array(has_website, dtype=bool),
+            np.array(scores, dtype=np.float64),
+            cell_degrees,
+        )
+
+    def __len__(self) -> int:
+        return len(self.cell_ids)
+
+    def _row_col(self, latitude: np.ndarray, longitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        row = np.clip(np.floor((latitude + 90) / self.cell_degrees), 0, self.rows - 1).astype(np.int64)
+        col = np.clip(np.floor((longitude + 180) / self.cell_degrees), 0, self.columns - 1).astype(np.int64)
+        return row, col
+
+    def _cell_ids(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        row, col = self._row_col(latitude, longitude)
+        return row * self.columns + col
+
+    def _candidates(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Positions of points in the grid cells overlapping a box (west <= east)"""
+        (row0, row1), (col0, col1) = self._row_col(np.array([south, north]), np.array([west, east]))
+        rows = np.arange(row0, row1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self.cell_ids, rows * self.columns + col0, side="left")
+        ends = np.searchsorted(self.cell_ids, rows * self.columns + col1, side="right")
+        spans = [np.arange(start, end) for start, end in zip(starts, ends) if end > start]
+        return np.concatenate(spans) if spans else np.array([], dtype=np.int64)
+
+    def _in_bounds(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Positions of points inside a box; boxes with west > east cross the antimeridian"""
+        if west > east:
+            return np.concatenate([self._in_bounds(south, west, north, 180.0), self._in_bounds(south, -180.0, north, east)])
+        positions = self._candidates(south, west, north, east)
+        lat = self.latitude[positions]
+        lon = self.longitude[positions]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return positions[inside]
+
+    def _filter(self, positions: np.ndarray, has_website: Optional[bool], min_score: Optional[float]) -> np.ndarray:
+        if has_website is not None:
+            positions = positions[self.has_website[positions] == has_website]
+        if min_score is not None:
+            # NaN (unscored) never passes a minimum score
+            positions = positions[self.opportunity_score[positions] >= min_score]
+        return positions
+
+    def within_bounds(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        has_website: Optional[bool] = None,
+        min_score: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[str], int]:
+        """Lead keys inside a box (highest opportunity score first) and the total match count"""
+        positions = self._filter(self._in_bounds(south, west, north, east), has_website, min_score)
+        scores = np.nan_to_num(self.opportunity_score[positions], nan=-1.0)
+        positions = positions[np.argsort(-scores, kind="stable")]
+        return self.keys[positions[:limit]].tolist(), len(positions)
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        has_website: Optional[bool] = None,
+        min_score: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[str], List[float], int]:
+        """Lead keys within radius_km of a point (nearest first), their distances and the total match count"""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        south, north = max(-90.0, latitude - dlat), min(90.0, latitude + dlat)
+        cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+        dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat) if cos_lat > 1e-9 else 180.0
+        if dlon >= 180.0:
+            positions = self._in_bounds(south, -180.0, north, 180.0)
+        else:
+            west = (longitude - dlon + 180) % 360 - 180
+            east = (longitude + dlon + 180) % 360 - 180
+            positions = self._in_bounds(south, west, north, east)
+
+        positions = self._filter(positions, has_website, min_score)
+        distances = haversine_km(latitude, longitude, self.latitude[positions], self.longitude[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")[:limit]
+        return self.keys[positions[order]].tolist(), distances[order].tolist(), len(positions)
+
+    def clusters(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        zoom: int,
+        has_website: Optional[bool] = None,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Group the points in a viewport into grid clusters sized for a map zoom level, largest first"""
+        positions = self._filter(self._in_bounds(south, west, north, east), has_website, min_score)
+        if len(positions) == 0:
+            return []
+
+        cell = 360 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+        lat = self.latitude[positions]
+        lon = self.longitude[positions]
+        cluster_ids = np.floor((lat + 90) / cell).astype(np.int64) * int(math.ceil(360 / cell)) + np.floor((lon + 180) / cell).astype(np.int64)
+        unique_ids, groups, counts = np.unique(cluster_ids, return_inverse=True, return_counts=True)
+
+        cluster_count = len(unique_ids)
+        lat_sums = np.bincount(groups, weights=lat, minlength=cluster_count)
+        lon_sums = np.bincount(groups, weights=lon, minlength=cluster_count)
+        without_website = np.bincount(groups, weights=~self.has_website[positions], minlength=cluster_count)
+        scores = self.opportunity_score[positions]
+        scored = ~np.isnan(scores)
+        score_sums = np.bincount(groups[scored], weights=scores[scored], minlength=cluster_count)
+        score_counts = np.bincount(groups[scored], minlength=cluster_count)
+        # Single-point clusters carry their lead key so the client can draw a marker directly
+        first = np.full(cluster_count, -1, dtype=np.int64)
+        first[groups] = positions
+
+        return [
+            {
+                "latitude": float(lat_sums[i] / counts[i]),
+                "longitude": float(lon_sums[i] / counts[i]),
+                "count": int(counts[i]),
+                "businesses_without_website": int(without_website[i]),
+                "avg_opportunity_score": float(score_sums[i] / score_counts[i]) if score_counts[i] else None,
+                "lead_key": self.keys[first[i]] if counts[i] == 1 else None,
+            }
+            for i in np.argsort(-counts, kind="stable")
+        ]
+
+
+_index: Optional[GeoGridIndex] = None
+_indexed_version: Optional[float] = None
+_last_checked = 0.0
+_refresh_lock = threading.Lock()
+
+
+def get_geo_index() -> GeoGridIndex:
+    """Return the shared index, rebuilding it from the lead store if leads changed (blocking; call via asyncio.to_thread)"""
+    global _index, _indexed_version, _last_checked
+
+    now = time.monotonic()
+    if _index is not None and now - _last_checked < GEO_INDEX_REFRESH_SECONDS:
+        return _index
+
+    # While another thread rebuilds, keep serving the current index; only the very first build is waited on
+    if not _refresh_lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if _index is not None and now - _last_checked < GEO_INDEX_REFRESH_SECONDS:
+            return _index
+        _last_checked = now
+        store = get_lead_store()
+        version = store.last_modified()
+        if _index is None or version != _indexed_version:
+            started = time.perf_counter()
+            index = GeoGridIndex.from_points(store.points())
+            _index, _indexed_version = index, version
+            print(f"Built geo index over {len(_index)} leads in {(time.perf_counter() - started) * 1000:.0f} ms")
+    finally:
+        _refresh_lock.release()
+    return _index
+
+
+__all__ = ["GeoGridIndex", "get_geo_index", "haversine_km"]
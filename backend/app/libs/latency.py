@@ -0,0 +1,55 @@
+"""Rolling latency recorder for monitoring endpoints.
+
+Usage:
+
+    from app.libs.latency import LatencyRecorder
+
+    ttft = LatencyRecorder("gemini_ttft_ms")
+    ttft.record(182.5)
+    ttft.stats()   # count, avg, p50, p95, p99 and max over the recent window
+
+Only the most recent `window` samples are kept, so memory is constant and the
+percentiles reflect current behaviour. The lifetime count is kept separately.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict
+
+
+class LatencyRecorder:
+    """Bounded window of latency samples (milliseconds) with percentile stats"""
+
+    def __init__(self, name: str, window: int = 1000):
+        self.name = name
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, milliseconds: float) -> None:
+        with self._lock:
+            self._samples.append(milliseconds)
+            self.count += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary of the recent window"""
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+
+        def percentile(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "name": self.name,
+            "count": count,
+            "window": len(samples),
+            "avg_ms": sum(samples) / len(samples) if samples else None,
+            "p50_ms": percentile(0.50) if samples else None,
+            "p95_ms": percentile(0.95) if samples else None,
+            "p99_ms": percentile(0.99) if samples else None,
+            "max_ms": samples[-1] if samples else None,
+        }
+
+
+__all__ = ["LatencyRecorder"]
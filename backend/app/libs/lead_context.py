@@ -0,0 +1,134 @@
+"""Compact, token-budgeted text tables of leads for LLM prompts.
+
+Usage:
+
+    from app.libs.lead_context import build_lead_context
+
+    context = build_lead_context(businesses, scores, top_k=50, token_budget=4000)
+    prompt = f"{context['text']}\n\nQuestion: {question}"
+    context["tokens_saved"]   # versus pasting the businesses as indented JSON
+
+`businesses` are stored BusinessData dicts. Instead of one JSON object per
+business, the leads become a single pipe-separated table: the header names
+each column once, and columns that are empty for every included lead are
+left out. Fields a model cannot use (image and maps URLs, Google ids,
+coordinates) are never included. Rows are ordered by opportunity score and
+cut at `top_k` and at `token_budget`. Tokens are estimated at
+CHARS_PER_TOKEN characters each, for both the table and the naive JSON it
+replaces.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+CHARS_PER_TOKEN = 4
+
+# Longest cell kept before truncating (business hours can run to hundreds of characters)
+MAX_CELL_CHARS = 80
+MAX_REASON_CHARS = 160
+
+# (header, getter) for every column a table may contain, in display order
+COLUMNS: List[Tuple[str, Callable[[Dict[str, Any]], Any]]] = [
+    ("name", lambda b: b.get("name")),
+    ("category", lambda b: b.get("category")),
+    ("rating", lambda b: b.get("rating")),
+    ("reviews", lambda b: b.get("reviews_count")),
+    ("website", lambda b: (b.get("contact") or {}).get("website") or ("yes" if b.get("has_website") else "none")),
+    ("phone", lambda b: (b.get("contact") or {}).get("phone")),
+    ("address", lambda b: (b.get("contact") or {}).get("address")),
+    ("email", lambda b: b.get("email")),
+    ("social", lambda b: " ".join(b.get("social_media") or []) or None),
+    ("hours", lambda b: b.get("business_hours")),
+    ("price", lambda b: b.get("price_level")),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for prompt budgeting"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def format_cell(value: Any, max_chars: int = MAX_CELL_CHARS) -> str:
+    """One table cell: no separators or newlines, long text truncated, empty for None"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        value = f"{value:g}"
+    text = " ".join(str(value).replace("|", "/").split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+def select_top_k(scores: Sequence[Optional[float]], top_k: int) -> List[int]:
+    """Indices of the `top_k` highest scores, keeping the original order for ties and unscored leads last"""
+    order = sorted(range(len(scores)), key=lambda i: -scores[i] if scores[i] is not None else float("inf"))
+    return order[:top_k]
+
+
+def naive_json(businesses: Sequence[Dict[str, Any]], scores: Sequence[Optional[float]]) -> str:
+    """The businesses serialized the way the frontend used to paste them into prompts"""
+    if any(score is not None for score in scores):
+        return json.dumps([{"business_data": b, "opportunity_score": s} for b, s in zip(businesses, scores)], indent=2)
+    return json.dumps(list(businesses), indent=2)
+
+
+def build_lead_context(
+    businesses: Sequence[Dict[str, Any]],
+    scores: Optional[Sequence[Optional[float]]] = None,
+    top_k: int = 50,
+    token_budget: int = 4000,
+    reasons: Optional[Callable[[Dict[str, Any]], List[str]]] = None,
+) -> Dict[str, Any]:
+    """Build the table for the top leads that fit the budget, with token counts against naive JSON"""
+    scores = list(scores) if scores is not None else [None] * len(businesses)
+    selected = select_top_k(scores, top_k)
+
+    # Cells for every candidate row; "why" is only worked out for rows that can be included
+    columns = [("score", None)] + COLUMNS if any(s is not None for s in scores) else list(COLUMNS)
+    rows: List[List[str]] = []
+    for i in selected:
+        row = [format_cell(scores[i]) if getter is None else format_cell(getter(businesses[i])) for _, getter in columns]
+        if reasons is not None:
+            row.append(format_cell("; ".join(reasons(businesses[i])), MAX_REASON_CHARS))
+        rows.append(row)
+    headers = [header for header, _ in columns] + (["why"] if reasons is not None else [])
+
+    # Drop columns that are empty in every candidate row
+    keep = [c for c in range(len(headers)) if any(row[c] for row in rows)]
+
+    def render(line: List[str]) -> str:
+        return "|".join(line[c] for c in keep)
+
+    header_line = render(headers)
+    lines = [header_line]
+    used = estimate_tokens(header_line)
+    for row in rows:
+        line = render(row)
+        cost = estimate_tokens(line + "\n")
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    included = len(lines) - 1
+
+    # Fewer rows can only leave more columns empty, which shortens the table further
+    if included < len(rows):
+        keep = [c for c in keep if any(row[c] for row in rows[:included])]
+        lines = [render(headers)] + [render(row) for row in rows[:included]]
+
+    text = "\n".join(lines) if included else ""
+    context_tokens = estimate_tokens(text)
+    naive_tokens = estimate_tokens(naive_json(businesses, scores))
+    return {
+        "text": text,
+        "columns": [headers[c] for c in keep] if included else [],
+        "included": included,
+        "total": len(businesses),
+        "truncated_by_budget": included < len(rows),
+        "context_tokens": context_tokens,
+        "naive_tokens": naive_tokens,
+        "tokens_saved": naive_tokens - context_tokens,
+        "savings_percent": round(100 * (1 - context_tokens / naive_tokens), 1) if naive_tokens else 0.0,
+    }
+
+
+__all__ = ["build_lead_context", "estimate_tokens", "select_top_k", "CHARS_PER_TOKEN"]
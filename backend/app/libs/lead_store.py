@@ -0,0 +1,432 @@
+"""Persistent, indexed store of every business the app has extracted.
+
+Usage:
+
+    from app.libs.lead_store import get_lead_store
+
+    store = get_lead_store()
+    await asyncio.to_thread(store.upsert_businesses, businesses, "Lethbridge, Alberta")
+    leads, total = await asyncio.to_thread(store.query_leads, location="Lethbridge, Alberta", has_website=False)
+
+Leads are upserted into SQLite keyed by Google placeId, falling back to cid,
+and finally to a hash of name + address for places without either. Secondary
+indexes on location, category, opportunity score, rating and has_website
+let filtered, sorted lead lists be served without calling Serper. The
+database path is LEAD_STORE_DB (default `leads.db` in the working directory).
+
+Each lead also stores a content fingerprint (rating, review count, website
+and hours). A stored opportunity score is dropped when the fingerprint
+changes without a new score, so a kept score always matches the stored
+content. Scores also record the scoring profile's name and a hash of its
+contents (`score_profile_hash`), so a profile whose weights were edited is
+not mistaken for the one that produced a stored score. `location_fetches` records when each query was last fetched and
+the fingerprints it returned, for incremental re-analysis.
+
+`result_sets` remembers which leads (and, for analyses, which scores) one
+search or analysis returned, under an opaque id. Later requests can refer to
+that result by id instead of sending the businesses back. Result sets
+expire after RESULT_SET_TTL_SECONDS.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LEAD_STORE_DB = os.environ.get("LEAD_STORE_DB", "leads.db")
+RESULT_SET_TTL_SECONDS = float(os.environ.get("RESULT_SET_TTL_SECONDS", str(7 * 86400)))
+
+# Columns that may be used to sort lead queries
+SORT_COLUMNS = {
+    "opportunity_score": "opportunity_score",
+    "rating": "rating",
+    "reviews_count": "reviews_count",
+    "name": "name",
+    "last_seen": "last_seen",
+}
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS leads (
+        lead_key TEXT PRIMARY KEY,
+        place_id TEXT,
+        cid TEXT,
+        name TEXT NOT NULL,
+        location TEXT,
+        category TEXT COLLATE NOCASE,
+        rating REAL,
+        reviews_count INTEGER,
+        has_website INTEGER NOT NULL,
+        opportunity_score REAL,
+        score_profile TEXT,
+        score_profile_hash TEXT,
+        fingerprint TEXT,
+        latitude REAL,
+        longitude REAL,
+        data TEXT NOT NULL,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS location_fetches (
+        fetch_key TEXT PRIMARY KEY,
+        location TEXT NOT NULL,
+        category TEXT,
+        fetched_at REAL NOT NULL,
+        fingerprints TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS result_sets (
+        result_set_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        location TEXT,
+        category TEXT,
+        score_profile TEXT,
+        created_at REAL NOT NULL,
+        entries TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_leads_location ON leads (location, has_website, opportunity_score)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_category ON leads (category)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_opportunity_score ON leads (opportunity_score)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_rating ON leads (rating)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_has_website ON leads (has_website)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_place_id ON leads (place_id)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_cid ON leads (cid)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_last_seen ON leads (last_seen)",
+    "CREATE INDEX IF NOT EXISTS idx_result_sets_created_at ON result_sets (created_at)",
+]
+
+
+# Columns added after the first release, applied to existing databases on connect
+COLUMN_MIGRATIONS = [
+    ("score_profile", "TEXT"),
+    ("fingerprint", "TEXT"),
+    ("score_profile_hash", "TEXT"),
+]
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a location string so equivalent searches share stored leads"""
+    return " ".join(location.lower().split())
+
+
+def row_to_lead(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a stored row into a lead dict with the decoded business"""
+    return {
+        "lead_key": row["lead_key"],
+        "location": row["location"],
+        "opportunity_score": row["opportunity_score"],
+        "business": json.loads(row["data"]),
+        "first_seen": row["first_seen"],
+        "last_seen": row["last_seen"],
+    }
+
+
+def business_fingerprint(business: Any) -> str:
+    """Content hash over the fields that affect scoring and outreach: rating, reviews, website and hours"""
+    content = json.dumps(
+        [business.rating, business.reviews_count, business.has_website, business.contact.website, business.business_hours],
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def lead_key(business: Any) -> str:
+    """Stable key for a business: placeId, then cid, then a hash of name and address"""
+    if business.place_id:
+        return f"place:{business.place_id}"
+    if business.cid:
+        return f"cid:{business.cid}"
+    fallback = f"{business.name.lower()}|{(business.contact.address or '').lower()}"
+    return "hash:" + hashlib.sha1(fallback.encode("utf-8")).hexdigest()
+
+
+class LeadStore:
+    """SQLite-backed lead table with upsert and indexed filtering"""
+
+    def __init__(self, path: str = LEAD_STORE_DB):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    for statement in SCHEMA:
+                        db.execute(statement)
+                    columns = {row["name"] for row in db.execute("PRAGMA table_info(leads)")}
+                    for column, column_type in COLUMN_MIGRATIONS:
+                        if column not in columns:
+                            db.execute(f"ALTER TABLE leads ADD COLUMN {column} {column_type}")
+                    db.commit()
+                    self._schema_ready = True
+            self._local.db = db
+        return db
+
+    def upsert_businesses(
+        self,
+        businesses: Iterable[Any],
+        location: Optional[str] = None,
+        scores: Optional[Sequence[Optional[float]]] = None,
+        score_profile: Optional[str] = None,
+        score_profile_hash: Optional[str] = None,
+    ) -> int:
+        """Insert or update businesses; existing scores are kept when no new score is given and the content is unchanged"""
+        now = time.time()
+        location_key = normalize_location(location) if location else None
+        rows = []
+        for i, business in enumerate(businesses):
+            score = scores[i] if scores is not None else None
+            rows.append((
+                lead_key(business),
+                business.place_id,
+                business.cid,
+                business.name,
+                location_key,
+                business.category,
+                business.rating,
+                business.reviews_count,
+                int(business.has_website),
+                None if score is None else float(score),
+                None if score is None else score_profile,
+                None if score is None else score_profile_hash,
+                business_fingerprint(business),
+                business.latitude,
+                business.longitude,
+                business.model_dump_json(),
+                now,
+                now,
+            ))
+        if not rows:
+            return 0
+
+        db = self._connect()
+        with db:
+            db.executemany(
+                """INSERT INTO leads (
+                    lead_key, place_id, cid, name, location, category, rating, reviews_count,
+                    has_website, opportunity_score, score_profile, score_profile_hash, fingerprint,
+                    latitude, longitude, data, first_seen, last_seen
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (lead_key) DO UPDATE SET
+                    place_id = COALESCE(excluded.place_id, leads.place_id),
+                    cid = COALESCE(excluded.cid, leads.cid),
+                    name = excluded.name,
+                    location = COALESCE(excluded.location, leads.location),
+                    category = excluded.category,
+                    rating = excluded.rating,
+                    reviews_count = excluded.reviews_count,
+                    has_website = excluded.has_website,
+                    opportunity_score = CASE
+                        WHEN excluded.opportunity_score IS NOT NULL THEN excluded.opportunity_score
+                        WHEN excluded.fingerprint = leads.fingerprint THEN leads.opportunity_score
+                    END,
+                    score_profile = CASE
+                        WHEN excluded.opportunity_score IS NOT NULL THEN excluded.score_profile
+                        WHEN excluded.fingerprint = leads.fingerprint THEN leads.score_profile
+                    END,
+                    score_profile_hash = CASE
+                        WHEN excluded.opportunity_score IS NOT NULL THEN excluded.score_profile_hash
+                        WHEN excluded.fingerprint = leads.fingerprint THEN leads.score_profile_hash
+                    END,
+                    fingerprint = excluded.fingerprint,
+                    latitude = excluded.latitude,
+                    longitude = excluded.longitude,
+                    data = excluded.data,
+                    last_seen = excluded.last_seen""",
+                rows,
+            )
+        return len(rows)
+
+    def query_leads(
+        self,
+        location: Optional[str] = None,
+        category: Optional[str] = None,
+        has_website: Optional[bool] = None,
+        min_score: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        sort_by: str = "opportunity_score",
+        descending: bool = True,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Return one page of matching leads (as stored rows) and the total match count"""
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by '{sort_by}'. Choose one of: {', '.join(SORT_COLUMNS)}")
+
+        clauses = []
+        params: List[Any] = []
+        if location:
+            clauses.append("location = ?")
+            params.append(normalize_location(location))
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if has_website is not None:
+            clauses.append("has_website = ?")
+            params.append(int(has_website))
+        if min_score is not None:
+            clauses.append("opportunity_score >= ?")
+            params.append(min_score)
+        if min_rating is not None:
+            clauses.append("rating >= ?")
+            params.append(min_rating)
+        if max_rating is not None:
+            clauses.append("rating <= ?")
+            params.append(max_rating)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        # NULLs always sort last, whichever direction is requested
+        column = SORT_COLUMNS[sort_by]
+        order = f"{column} IS NULL, {column} {'DESC' if descending else 'ASC'}, lead_key"
+
+        db = self._connect()
+        total = db.execute(f"SELECT COUNT(*) FROM leads {where}", params).fetchone()[0]
+        rows = db.execute(
+            f"SELECT lead_key, location, opportunity_score, data, first_seen, last_seen FROM leads {where} "
+            f"ORDER BY {order} LIMIT ? OFFSET ?",
+            [*params, limit, offset],
+        ).fetchall()
+
+        return [row_to_lead(row) for row in rows], total
+
+    def get_leads(self, keys: Sequence[str]) -> List[Dict[str, Any]]:
+        """Fetch leads by key, in the order given; unknown keys are skipped"""
+        db = self._connect()
+        found: Dict[str, Dict[str, Any]] = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = db.execute(
+                f"SELECT lead_key, location, opportunity_score, data, first_seen, last_seen FROM leads "
+                f"WHERE lead_key IN ({','.join('?' * len(chunk))})",
+                list(chunk),
+            ).fetchall()
+            for row in rows:
+                found[row["lead_key"]] = row_to_lead(row)
+        return [found[key] for key in keys if key in found]
+
+    def get_scores(self, keys: Sequence[str]) -> Dict[str, Tuple[float, Optional[str], str]]:
+        """Stored (opportunity_score, score_profile_hash, fingerprint) for the given keys that have a score"""
+        db = self._connect()
+        scores: Dict[str, Tuple[float, Optional[str], str]] = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = db.execute(
+                f"SELECT lead_key, opportunity_score, score_profile_hash, fingerprint FROM leads "
+                f"WHERE opportunity_score IS NOT NULL AND lead_key IN ({','.join('?' * len(chunk))})",
+                list(chunk),
+            ).fetchall()
+            for row in rows:
+                scores[row["lead_key"]] = (row["opportunity_score"], row["score_profile_hash"], row["fingerprint"])
+        return scores
+
+    def get_fetch(self, fetch_key: str) -> Optional[Dict[str, Any]]:
+        """When a query was last fetched and the {lead_key: fingerprint} it returned, or None"""
+        db = self._connect()
+        row = db.execute("SELECT fetched_at, fingerprints FROM location_fetches WHERE fetch_key = ?", (fetch_key,)).fetchone()
+        if row is None:
+            return None
+        return {"fetched_at": row["fetched_at"], "fingerprints": json.loads(row["fingerprints"])}
+
+    def record_fetch(self, fetch_key: str, location: str, category: Optional[str], fingerprints: Dict[str, str]) -> float:
+        """Record a completed fetch of a query and the fingerprints it returned"""
+        fetched_at = time.time()
+        db = self._connect()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO location_fetches (fetch_key, location, category, fetched_at, fingerprints) VALUES (?, ?, ?, ?, ?)",
+                (fetch_key, normalize_location(location), category, fetched_at, json.dumps(fingerprints)),
+            )
+        return fetched_at
+
+    def create_result_set(
+        self,
+        kind: str,
+        keys: Sequence[str],
+        scores: Optional[Sequence[Optional[float]]] = None,
+        location: Optional[str] = None,
+        category: Optional[str] = None,
+        score_profile: Optional[str] = None,
+    ) -> str:
+        """Save the ordered lead keys (and scores) a search or analysis returned; returns the new result set id"""
+        result_set_id = uuid.uuid4().hex
+        now = time.time()
+        entries = [[key, scores[i] if scores is not None else None] for i, key in enumerate(keys)]
+        db = self._connect()
+        with db:
+            db.execute("DELETE FROM result_sets WHERE created_at < ?", (now - RESULT_SET_TTL_SECONDS,))
+            db.execute(
+                "INSERT INTO result_sets (result_set_id, kind, location, category, score_profile, created_at, entries) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (result_set_id, kind, normalize_location(location) if location else None, category, score_profile, now, json.dumps(entries)),
+            )
+        return result_set_id
+
+    def get_result_set(self, result_set_id: str) -> Optional[Dict[str, Any]]:
+        """A saved result set with its entries as (lead_key, score) pairs, or None if unknown or expired"""
+        db = self._connect()
+        row = db.execute(
+            "SELECT result_set_id, kind, location, category, score_profile, created_at, entries FROM result_sets "
+            "WHERE result_set_id = ? AND created_at >= ?",
+            (result_set_id, time.time() - RESULT_SET_TTL_SECONDS),
+        ).fetchone()
+        if row is None:
+            return None
+        result_set = dict(row)
+        result_set["entries"] = [tuple(entry) for entry in json.loads(row["entries"])]
+        return result_set
+
+    def points(self) -> List[Tuple[str, float, float, int, Optional[float]]]:
+        """(lead_key, latitude, longitude, has_website, opportunity_score) for every lead with coordinates"""
+        db = self._connect()
+        return db.execute(
+            "SELECT lead_key, latitude, longitude, has_website, opportunity_score FROM leads "
+            "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        ).fetchall()
+
+    def last_modified(self) -> Optional[float]:
+        """Timestamp of the most recent upsert, or None for an empty store"""
+        db = self._connect()
+        return db.execute("SELECT MAX(last_seen) FROM leads").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Lead counts for monitoring"""
+        db = self._connect()
+        total = db.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+        locations = db.execute("SELECT COUNT(DISTINCT location) FROM leads").fetchone()[0]
+        without_website = db.execute("SELECT COUNT(*) FROM leads WHERE has_website = 0").fetchone()[0]
+        result_sets = db.execute("SELECT COUNT(*) FROM result_sets").fetchone()[0]
+        return {
+            "path": self.path,
+            "total_leads": total,
+            "locations": locations,
+            "leads_without_website": without_website,
+            "result_sets": result_sets,
+        }
+
+
+_store: Optional[LeadStore] = None
+
+
+def get_lead_store() -> LeadStore:
+    """Return the shared lead store"""
+    global _store
+    if _store is None:
+        _store = LeadStore()
+    return _store
+
+
+__all__ = ["LeadStore", "get_lead_store", "lead_key", "business_fingerprint", "normalize_location", "SORT_COLUMNS"]
@@ -0,0 +1,273 @@
+"""In-process metrics with Prometheus text exposition.
+
+Usage:
+
+    from app.libs.metrics import UPSTREAM_LATENCY, CACHE_LOOKUPS, track, render_metrics
+
+    with track(UPSTREAM_LATENCY, "serper", "search"):   # observes seconds, labelled ok/error
+        response = await client.post(...)
+
+    CACHE_LOOKUPS.inc("serper_places", "hit")
+    text = render_metrics()                               # body for GET /metrics
+
+Label values are passed positionally, in the order of the metric's label
+names. Each thread writes to its own shard (a plain dict), so recording
+takes no lock and costs about a microsecond. Since the event loop runs in
+one thread, async code never contends at all. Shards are only merged when
+the metrics are rendered.
+
+MetricsMiddleware records every HTTP request in a latency histogram
+labelled by method, route template (not raw path, so ids do not explode
+the label set) and status code.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Seconds; spans sub-millisecond cache hits to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def sort_key(item: Tuple[Tuple, Any]) -> Tuple[str, ...]:
+    """Stable output order even when a label mixes value types"""
+    return tuple(str(value) for value in item[0])
+
+
+class ShardedMetric(ABC):
+    """Per-thread shards of {label values: state}, merged on read"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple, Any]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple, Any]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[Tuple, Any] = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self) -> List[Dict[Tuple, Any]]:
+        with self._lock:
+            shards = list(self._shards)
+        # dict() copies in one step under the GIL, so a shard being written is never iterated
+        return [dict(shard) for shard in shards]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Prometheus sample lines for this metric"""
+
+
+class Counter(ShardedMetric):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def inc(self, *label_values: Any, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def values(self) -> Dict[Tuple, float]:
+        totals: Dict[Tuple, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.labelnames, labels)} {value:g}"
+            for labels, value in sorted(self.values().items(), key=sort_key)
+        ]
+
+
+class Histogram(ShardedMetric):
+    """Bucketed distribution with sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values: Any) -> None:
+        shard = self._shard()
+        state = shard.get(label_values)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, the last slot is +Inf, then the running sum
+            state = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def values(self) -> Dict[Tuple, List[float]]:
+        totals: Dict[Tuple, List[float]] = {}
+        for shard in self._snapshots():
+            for labels, state in shard.items():
+                merged = totals.get(labels)
+                if merged is None:
+                    totals[labels] = list(state)
+                else:
+                    for i, value in enumerate(state):
+                        merged[i] += value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, state in sorted(self.values().items(), key=sort_key):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {state[-1]:.6f}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, ShardedMetric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: ShardedMetric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-imported modules get the metric that already holds the data
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status", ("method", "route", "status")
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to upstream APIs", ("upstream", "operation", "outcome")
+)
+AUTH_LATENCY = REGISTRY.histogram(
+    "auth_token_duration_seconds", "Time spent authorizing a bearer token", ("result",)
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "cache_lookups_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "upstream_retries_total", "Upstream calls retried after a failure or throttling", ("upstream",)
+)
+
+
+@contextmanager
+def track(histogram: Histogram, *label_values: Any) -> Iterator[None]:
+    """Observe the block's duration, with a final 'ok' or 'error' label"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.observe(time.perf_counter() - started, *label_values, outcome)
+
+
+def record_retry(upstream: str) -> Callable[[Any], None]:
+    """tenacity before_sleep hook counting retries of an upstream"""
+    def before_sleep(retry_state: Any) -> None:
+        UPSTREAM_RETRIES.inc(upstream)
+        print(f"Retrying {upstream} call (attempt {retry_state.attempt_number} failed)")
+    return before_sleep
+
+
+def render_metrics() -> str:
+    """Every registered metric in Prometheus text format"""
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per method, route template and status"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status[0],
+            )
+
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "MetricsMiddleware",
+    "REGISTRY",
+    "HTTP_LATENCY",
+    "UPSTREAM_LATENCY",
+    "AUTH_LATENCY",
+    "CACHE_LOOKUPS",
+    "UPSTREAM_RETRIES",
+    "track",
+    "record_retry",
+    "render_metrics",
+]
@@ -0,0 +1,184 @@
+"""Per-API-key Gemini model catalogs with precomputed model resolution.
+
+Usage:
+
+    from app.libs.model_catalog import ModelCatalogCache
+
+    catalogs = ModelCatalogCache("gemini_models", ttl_seconds=3600)
+    catalog = await catalogs.get(key_id, lambda: asyncio.to_thread(fetch_model_names, api_key))
+    catalog.resolve("gemini-pro")     # -> model used for generation
+    catalog.validation_model          # -> model used to validate a key
+
+Resolution follows the order the Gemini router has always used (requested
+model, then a Gemini 2.0 model, then gemini-1.5-flash, then any Gemini
+model, then the first available). Fallbacks are worked out once when the
+catalog is built and every answer is memoized, so resolving a model is a
+dict lookup.
+
+Entries live for `ttl_seconds`. Once an entry is older than
+`refresh_after_seconds` it is still served, and a background task refreshes
+it, so callers only wait on upstream when a key is new or fully expired.
+Concurrent fetches for one key are coalesced with SingleFlight.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.libs.metrics import CACHE_LOOKUPS
+from app.libs.singleflight import SingleFlight
+
+DEFAULT_MODEL = "models/gemini-1.5-flash"
+
+# Bound on memoized answers for requested names that are not in the catalog
+MAX_RESOLVED_NAMES = 1024
+
+
+def first_match(model_names: List[str], predicate: Callable[[str], bool]) -> Optional[str]:
+    """First model name satisfying `predicate`, or None"""
+    return next((name for name in model_names if predicate(name)), None)
+
+
+class ModelCatalog:
+    """Model names available to one API key, plus precomputed resolution tables"""
+
+    def __init__(self, model_names: List[str]):
+        self.model_names = list(model_names)
+        self.fallback_model = self._fallback_model()
+        self.validation_model = self._validation_model()
+
+        # Precompute answers for every available model, with and without the "models/" prefix
+        self._resolved: Dict[str, str] = {}
+        for name in self.model_names:
+            for requested in (name, name[len("models/"):] if name.startswith("models/") else f"models/{name}"):
+                if requested not in self._resolved:
+                    self._resolved[requested] = self._resolve_uncached(requested)
+
+    def _fallback_model(self) -> str:
+        names = self.model_names
+        if any("gemini-2.0" in name for name in names):
+            # Only non-vision 2.0 models qualify; a catalog with nothing else drops to the default
+            return first_match(names, lambda name: "gemini-2.0" in name and "vision" not in name) or DEFAULT_MODEL
+        if DEFAULT_MODEL in names:
+            return DEFAULT_MODEL
+        if any("models/gemini" in name for name in names):
+            return first_match(names, lambda name: "models/gemini" in name and "vision" not in name) or names[0]
+        return names[0] if names else DEFAULT_MODEL
+
+    def _validation_model(self) -> str:
+        names = self.model_names
+        if "models/gemini-1.5-flash" in names:
+            return "models/gemini-1.5-flash"
+        if "models/gemini-pro" in names:
+            return "models/gemini-pro"
+        if any("gemini-2.0" in name for name in names):
+            return (
+                first_match(names, lambda name: "gemini-2.0" in name and "vision" not in name)
+                or first_match(names, lambda name: "models/gemini" in name and "vision" not in name)
+                or names[0]
+            )
+        return names[0] if names else DEFAULT_MODEL
+
+    def resolve(self, requested: str) -> str:
+        """Model to use for a requested name"""
+        resolved = self._resolved.get(requested)
+        if resolved is None:
+            resolved = self._resolve_uncached(requested)
+            if len(self._resolved) < len(self.model_names) * 2 + MAX_RESOLVED_NAMES:
+                self._resolved[requested] = resolved
+        return resolved
+
+    def _resolve_uncached(self, requested: str) -> str:
+        with_prefix = requested if requested.startswith("models/") else f"models/{requested}"
+        without_prefix = requested[len("models/"):] if requested.startswith("models/") else requested
+        if with_prefix in self.model_names:
+            return with_prefix
+        # Partial names pick the first model containing them
+        return first_match(self.model_names, lambda name: without_prefix in name) or self.fallback_model
+
+
+class ModelCatalogCache:
+    """Bounded per-key catalog cache with TTL and background refresh"""
+
+    def __init__(self, name: str, ttl_seconds: float = 3600, refresh_after_seconds: Optional[float] = None, max_entries: int = 256):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.refresh_after_seconds = ttl_seconds * 0.8 if refresh_after_seconds is None else refresh_after_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[ModelCatalog, float]]" = OrderedDict()
+        self._flight = SingleFlight(f"{name}_fetch")
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[List[str]]]) -> ModelCatalog:
+        async def load() -> ModelCatalog:
+            catalog = ModelCatalog(await fetch())
+            self._entries[key] = (catalog, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return catalog
+
+        return await self._flight.do(key, load)
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[List[str]]]) -> None:
+        try:
+            await self._fetch(key, fetch)
+            self.refreshes += 1
+        except Exception as e:
+            # Keep serving the cached catalog until it expires
+            self.refresh_failures += 1
+            print(f"Background refresh of {self.name} catalog failed: {str(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[List[str]]]) -> ModelCatalog:
+        """Return the catalog for `key`, fetching it with `fetch` when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            catalog, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl_seconds:
+                self.hits += 1
+                CACHE_LOOKUPS.inc(self.name, "hit")
+                self._entries.move_to_end(key)
+                if age >= self.refresh_after_seconds and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    task = asyncio.create_task(self._refresh(key, fetch))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return catalog
+            del self._entries[key]
+
+        self.misses += 1
+        CACHE_LOOKUPS.inc(self.name, "miss")
+        return await self._fetch(key, fetch)
+
+    def invalidate(self, key: str) -> None:
+        """Drop the catalog for one key"""
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "refresh_after_seconds": self.refresh_after_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "background_refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "fetch_singleflight": self._flight.stats(),
+        }
+
+
+__all__ = ["ModelCatalog", "ModelCatalogCache", "DEFAULT_MODEL"]
@@ -0,0 +1,149 @@
+"""Batch opportunity scoring with named weight/threshold profiles.
+
+Usage:
+
+    from app.libs.opportunity_scoring import get_scoring_profile
+    from app.libs.business_frame import BusinessFrame
+
+    profile = get_scoring_profile("default")
+    scores = profile.score_frame(BusinessFrame.from_businesses(businesses))   # one vectorized pass
+    reasons, improvements = profile.explain(businesses[i])                    # text only when needed
+
+Profiles are read from `scoring_profiles.json` next to this module, or from
+the file named by SCORING_PROFILES_PATH. The "default" profile reproduces
+the original hard-coded weights in business_analysis.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from app.libs.business_frame import BusinessFrame
+
+DEFAULT_SCORING_PROFILES_PATH = os.path.join(os.path.dirname(__file__), "scoring_profiles.json")
+SCORING_PROFILES_PATH = os.environ.get("SCORING_PROFILES_PATH", DEFAULT_SCORING_PROFILES_PATH)
+
+
+class ScoreTier(BaseModel):
+    below: float = Field(..., description="Tier applies when the value is below this threshold")
+    points: float
+    reason: str = Field(..., description="Reason text; {value} is replaced with the business value")
+    improvement: str
+
+
+class ScoringProfile(BaseModel):
+    name: str
+    description: Optional[str] = None
+    no_website_points: float = 40
+    no_website_reason: str = "No website detected"
+    no_website_improvement: str = "Create a professional business website"
+    rating_tiers: List[ScoreTier] = Field(default_factory=list, description="Checked in order; the first matching tier applies")
+    no_rating_points: float = 15
+    no_rating_reason: str = "No Google rating available"
+    no_rating_improvement: str = "Web presence to establish online reputation"
+    review_tiers: List[ScoreTier] = Field(default_factory=list, description="Checked in order; the first matching tier applies")
+    no_reviews_points: float = 15
+    no_reviews_reason: str = "No reviews available"
+    no_reviews_improvement: str = "Website with testimonial section"
+    max_score: float = 100
+
+    @property
+    def content_hash(self) -> str:
+        """Digest of the whole profile, stored with each score so scores from an edited profile are not reused"""
+        return hashlib.sha256(self.model_dump_json().encode("utf-8")).hexdigest()[:16]
+
+    def _tier_points(self, values: np.ndarray, tiers: List[ScoreTier], missing_points: float) -> np.ndarray:
+        present = ~np.isnan(values)
+        if tiers:
+            # NaN compares False everywhere, so missing values fall through to the default
+            points = np.select([values < tier.below for tier in tiers], [tier.points for tier in tiers], default=0.0)
+        else:
+            points = np.zeros(len(values))
+        return np.where(present, points, missing_points)
+
+    def score_frame(self, frame: BusinessFrame) -> np.ndarray:
+        """Score every business in the frame in one vectorized pass"""
+        scores = np.where(frame.has_website, 0.0, self.no_website_points)
+        scores = scores + self._tier_points(frame.rating, self.rating_tiers, self.no_rating_points)
+        scores = scores + self._tier_points(frame.reviews_count, self.review_tiers, self.no_reviews_points)
+        return np.minimum(scores, self.max_score)
+
+    def _explain_tier(self, value: Any, tiers: List[ScoreTier], reasons: List[str], improvements: List[str]) -> float:
+        for tier in tiers:
+            if value < tier.below:
+                reasons.append(tier.reason.format(value=value))
+                improvements.append(tier.improvement)
+                return tier.points
+        return 0
+
+    def score_one(self, business: Any) -> Tuple[float, List[str], List[str]]:
+        """Score a single business along with its reasons and improvement areas"""
+        score = 0
+        reasons: List[str] = []
+        improvements: List[str] = []
+
+        if not business.has_website:
+            score += self.no_website_points
+            reasons.append(self.no_website_reason)
+            improvements.append(self.no_website_improvement)
+
+        if business.rating is not None:
+            score += self._explain_tier(business.rating, self.rating_tiers, reasons, improvements)
+        else:
+            score += self.no_rating_points
+            reasons.append(self.no_rating_reason)
+            improvements.append(self.no_rating_improvement)
+
+        if business.reviews_count is not None:
+            score += self._explain_tier(business.reviews_count, self.review_tiers, reasons, improvements)
+        else:
+            score += self.no_reviews_points
+            reasons.append(self.no_reviews_reason)
+            improvements.append(self.no_reviews_improvement)
+
+        return min(score, self.max_score), reasons, improvements
+
+    def explain(self, business: Any) -> Tuple[List[str], List[str]]:
+        """Build the reason and improvement text for one business"""
+        _, reasons, improvements = self.score_one(business)
+        return reasons, improvements
+
+
+_profiles: Optional[Dict[str, ScoringProfile]] = None
+
+
+def load_scoring_profiles(path: str = SCORING_PROFILES_PATH) -> Dict[str, ScoringProfile]:
+    """Read and validate every profile in a profiles file"""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {name: ScoringProfile(name=name, **config) for name, config in raw.items()}
+
+
+def get_scoring_profiles() -> Dict[str, ScoringProfile]:
+    """Return all configured profiles, loading them on first use"""
+    global _profiles
+    if _profiles is None:
+        _profiles = load_scoring_profiles()
+        print(f"Loaded scoring profiles: {list(_profiles)}")
+    return _profiles
+
+
+def get_scoring_profile(name: str = "default") -> ScoringProfile:
+    """Look up a profile by name; raises KeyError for unknown names"""
+    profiles = get_scoring_profiles()
+    if name not in profiles:
+        raise KeyError(f"Unknown scoring profile '{name}'. Available profiles: {', '.join(profiles)}")
+    return profiles[name]
+
+
+__all__ = [
+    "ScoreTier",
+    "ScoringProfile",
+    "load_scoring_profiles",
+    "get_scoring_profiles",
+    "get_scoring_profile",
+]
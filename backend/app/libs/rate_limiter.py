@@ -0,0 +1,287 @@
+"""Async rate limiters for upstream APIs.
+
+Usage:
+
+    from app.libs.rate_limiter import TokenBucketLimiter, AdaptiveRateLimiter
+
+    limiter = TokenBucketLimiter("serper", rate_per_second=5, burst=10)
+
+    await limiter.acquire(api_key)  # waits (without blocking the event loop) until a token is free
+
+    adaptive = AdaptiveRateLimiter("gemini", initial_rate=2, min_rate=0.2, max_rate=10)
+
+    await adaptive.acquire(api_key)
+    adaptive.on_success(api_key)    # rate creeps up
+    adaptive.on_throttle(api_key)   # rate is cut after a 429
+
+TokenBucketLimiter enforces a fixed rate. Bucket state lives in a SQLite WAL
+database so every uvicorn worker on the host draws from the same buckets.
+Buckets are keyed by a hash of the upstream API key, so raw keys are never
+written to disk. Within a process, callers for the same key queue on a FIFO
+lock and are served in arrival order.
+
+AdaptiveRateLimiter is for upstreams whose quota is not known in advance. It
+paces calls per key and adjusts the rate AIMD-style: each success adds
+`increase` requests/second, and each throttle multiplies the rate by
+`decrease_factor`. Throttles that arrive within one interval of the last cut
+are treated as part of the same burst and do not cut the rate again. State is
+per process and LRU-bounded to `max_keys` keys.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_RATE_LIMIT_DB = os.path.join(tempfile.gettempdir(), "octavia_rate_limits.db")
+
+
+class TokenBucketLimiter:
+    """Token bucket with configurable burst and refill rate, keyed per API key"""
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_second: float,
+        burst: float,
+        sqlite_path: Optional[str] = DEFAULT_RATE_LIMIT_DB,
+    ):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.sqlite_path = sqlite_path
+
+        self._queues: Dict[str, asyncio.Lock] = {}
+        self._local = threading.local()
+        self._memory_buckets: Dict[str, Tuple[float, float]] = {}
+        self._memory_lock = threading.Lock()
+
+        self.acquired = 0
+        self.delayed = 0
+        self.total_wait_seconds = 0.0
+        self.waiting = 0
+
+    def _bucket_id(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        return f"{self.name}:{digest}"
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            directory = os.path.dirname(self.sqlite_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.sqlite_path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets ("
+                "bucket TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.db = db
+        return db
+
+    def _refill(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(self.burst, tokens + max(0.0, now - updated_at) * self.rate_per_second)
+
+    def _take(self, tokens: float, updated_at: float, now: float, cost: float) -> Tuple[float, float]:
+        """Return (remaining tokens, seconds to wait); wait is 0 when the take succeeded"""
+        available = self._refill(tokens, updated_at, now)
+        if available >= cost:
+            return available - cost, 0.0
+        return available, (cost - available) / self.rate_per_second
+
+    def _try_acquire(self, bucket: str, cost: float) -> float:
+        """Attempt to take tokens from the shared bucket (blocking, runs in a thread)"""
+        now = time.time()
+
+        if not self.sqlite_path:
+            with self._memory_lock:
+                tokens, updated_at = self._memory_buckets.get(bucket, (self.burst, now))
+                remaining, wait = self._take(tokens, updated_at, now, cost)
+                self._memory_buckets[bucket] = (remaining, now)
+            return wait
+
+        db = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front so workers never race on a bucket
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE bucket = ?", (bucket,)
+            ).fetchone()
+            tokens, updated_at = row if row is not None else (self.burst, now)
+            remaining, wait = self._take(tokens, updated_at, now, cost)
+            db.execute(
+                "INSERT OR REPLACE INTO token_buckets (bucket, tokens, updated_at) VALUES (?, ?, ?)",
+                (bucket, remaining, now),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return wait
+
+    async def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Wait until `cost` tokens are available for `key`; returns the time spent waiting"""
+        bucket = self._bucket_id(key)
+        queue = self._queues.get(bucket)
+        if queue is None:
+            queue = self._queues[bucket] = asyncio.Lock()
+
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, so callers are served fairly
+            async with queue:
+                while True:
+                    wait = await asyncio.to_thread(self._try_acquire, bucket, cost)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        if waited > 0.001:
+            self.delayed += 1
+            self.total_wait_seconds += waited
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters describing how often callers had to wait"""
+        return {
+            "name": self.name,
+            "rate_per_second": self.rate_per_second,
+            "burst": self.burst,
+            "shared": bool(self.sqlite_path),
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "waiting": self.waiting,
+            "total_wait_seconds": self.total_wait_seconds,
+        }
+
+
+class AdaptiveRate:
+    """Pacing state for one key"""
+
+    __slots__ = ("rate", "next_slot", "last_decrease")
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.next_slot = 0.0
+        self.last_decrease = 0.0
+
+
+class AdaptiveRateLimiter:
+    """Per-key pacing with additive increase on success and multiplicative decrease on throttling"""
+
+    def __init__(
+        self,
+        name: str,
+        initial_rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float = 0.1,
+        decrease_factor: float = 0.5,
+        max_keys: int = 1024,
+    ):
+        if not 0 < min_rate <= initial_rate <= max_rate:
+            raise ValueError("rates must satisfy 0 < min_rate <= initial_rate <= max_rate")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1")
+
+        self.name = name
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.max_keys = max_keys
+
+        self._rates: "OrderedDict[str, AdaptiveRate]" = OrderedDict()
+
+        self.acquired = 0
+        self.delayed = 0
+        self.total_wait_seconds = 0.0
+        self.successes = 0
+        self.throttles = 0
+        self.decreases = 0
+
+    def _state(self, key: str) -> AdaptiveRate:
+        key_id = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        state = self._rates.get(key_id)
+        if state is None:
+            state = self._rates[key_id] = AdaptiveRate(self.initial_rate)
+            while len(self._rates) > self.max_keys:
+                self._rates.popitem(last=False)
+        else:
+            self._rates.move_to_end(key_id)
+        return state
+
+    async def acquire(self, key: str) -> float:
+        """Wait for this key's next send slot; returns the time spent waiting"""
+        state = self._state(key)
+        now = time.monotonic()
+        # Reserve the slot before sleeping so concurrent callers line up behind each other
+        slot = max(now, state.next_slot)
+        state.next_slot = slot + 1.0 / state.rate
+        waited = slot - now
+        if waited > 0:
+            await asyncio.sleep(waited)
+            self.delayed += 1
+            self.total_wait_seconds += waited
+        self.acquired += 1
+        return waited
+
+    def on_success(self, key: str) -> None:
+        """Additive increase after a call the upstream accepted"""
+        state = self._state(key)
+        state.rate = min(self.max_rate, state.rate + self.increase)
+        self.successes += 1
+
+    def on_throttle(self, key: str, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease after a 429, pausing the key for `retry_after` seconds if given"""
+        state = self._state(key)
+        now = time.monotonic()
+        self.throttles += 1
+        if now - state.last_decrease >= 1.0 / state.rate:
+            state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+            state.last_decrease = now
+            self.decreases += 1
+        pause = retry_after if retry_after is not None else 1.0 / state.rate
+        state.next_slot = max(state.next_slot, now + pause)
+
+    def rate(self, key: str) -> float:
+        """Current requests/second allowed for a key"""
+        return self._state(key).rate
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters describing pacing and backoff"""
+        rates = [state.rate for state in self._rates.values()]
+        return {
+            "name": self.name,
+            "initial_rate": self.initial_rate,
+            "min_rate": self.min_rate,
+            "max_rate": self.max_rate,
+            "keys": len(rates),
+            "avg_rate": sum(rates) / len(rates) if rates else None,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "total_wait_seconds": self.total_wait_seconds,
+            "successes": self.successes,
+            "throttles": self.throttles,
+            "rate_decreases": self.decreases,
+        }
+
+
+__all__ = ["TokenBucketLimiter", "AdaptiveRateLimiter", "DEFAULT_RATE_LIMIT_DB"]
@@ -0,0 +1,78 @@
+"""Shared async HTTP client for the Serper API.
+
+Usage:
+
+    from app.libs.serper_client import get_serper_client
+
+    client = get_serper_client()
+    response = await client.get("/places", params={"q": query, "apiKey": key})
+
+The client keeps a pool of keep-alive connections to google.serper.dev so
+queries reuse TCP/TLS sessions instead of opening a new connection each time.
+`startup_serper_client` and `shutdown_serper_client` are registered as
+lifecycle hooks in `main.create_app`.
+"""
+
+import os
+from typing import Optional
+
+import httpx
+
+SERPER_BASE_URL = "https://google.serper.dev"
+
+# Pool and timeout settings, overridable through the environment
+SERPER_MAX_CONNECTIONS = int(os.environ.get("SERPER_MAX_CONNECTIONS", "50"))
+SERPER_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("SERPER_MAX_KEEPALIVE_CONNECTIONS", "20"))
+SERPER_KEEPALIVE_EXPIRY = float(os.environ.get("SERPER_KEEPALIVE_EXPIRY", "30"))
+SERPER_CONNECT_TIMEOUT = float(os.environ.get("SERPER_CONNECT_TIMEOUT", "5"))
+SERPER_READ_TIMEOUT = float(os.environ.get("SERPER_READ_TIMEOUT", "20"))
+SERPER_POOL_TIMEOUT = float(os.environ.get("SERPER_POOL_TIMEOUT", "10"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_serper_client() -> httpx.AsyncClient:
+    """Create a pooled async client configured for the Serper API"""
+    limits = httpx.Limits(
+        max_connections=SERPER_MAX_CONNECTIONS,
+        max_keepalive_connections=SERPER_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=SERPER_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=SERPER_CONNECT_TIMEOUT,
+        read=SERPER_READ_TIMEOUT,
+        write=SERPER_READ_TIMEOUT,
+        pool=SERPER_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(base_url=SERPER_BASE_URL, limits=limits, timeout=timeout)
+
+
+def get_serper_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily if startup has not run"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_serper_client()
+    return _client
+
+
+async def startup_serper_client() -> None:
+    """Open the shared client when the app starts"""
+    get_serper_client()
+    print(f"Serper client ready (max_connections={SERPER_MAX_CONNECTIONS})")
+
+
+async def shutdown_serper_client() -> None:
+    """Close pooled connections when the app shuts down"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    print("Serper client closed")
+
+
+__all__ = [
+    "create_serper_client",
+    "get_serper_client",
+    "startup_serper_client",
+    "shutdown_serper_client",
+]
@@ -0,0 +1,68 @@
+"""Single-flight coalescing for identical concurrent upstream calls.
+
+Usage:
+
+    from app.libs.singleflight import SingleFlight
+
+    flight = SingleFlight("serper_places")
+
+    result = await flight.do(key, lambda: fetch(query))
+
+While a call for `key` is in flight, every other caller with the same key
+awaits that call and receives its result (or exception) instead of issuing
+its own upstream request.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one in-flight call and its result between identical concurrent callers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn` once per key at a time; concurrent callers share its outcome"""
+        self.calls += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._finish(key, t))
+
+        # Shield so one caller disconnecting does not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters describing how many calls were coalesced"""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "coalesced_rate": (self.coalesced / self.calls) if self.calls else 0.0,
+        }
+
+
+__all__ = ["SingleFlight"]
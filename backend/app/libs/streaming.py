@@ -0,0 +1,65 @@
+"""Helpers for streaming endpoints that emit one JSON frame per result.
+
+Usage:
+
+    from app.libs.streaming import stream_frames
+
+    @router.post("/things/stream")
+    async def stream_things(http_request: Request):
+        async def frames():
+            async for thing in produce_things():
+                yield "thing", thing.model_dump()
+            yield "summary", {"count": n}
+
+        return stream_frames(http_request, frames())
+
+Frames are sent as newline-delimited JSON (`{"type": ..., "data": ...}` per
+line) by default, or as server-sent events when the client sends
+`Accept: text/event-stream`; pass `sse=True` to always send SSE. If the
+producer raises, an `error` frame is emitted and the stream ends.
+"""
+
+import json
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from starlette.requests import Request
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def wants_sse(request: Request) -> bool:
+    """Whether the client asked for server-sent events instead of NDJSON"""
+    return SSE_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def encode_frame(frame_type: str, data: Any, sse: bool = False) -> str:
+    """Encode one frame as an NDJSON line or an SSE event"""
+    if sse:
+        return f"event: {frame_type}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"type": frame_type, "data": data}) + "\n"
+
+
+async def encode_frames(frames: AsyncIterator[Tuple[str, Any]], sse: bool = False) -> AsyncIterator[str]:
+    """Encode (type, data) pairs, turning a failure mid-stream into an error frame"""
+    try:
+        async for frame_type, data in frames:
+            yield encode_frame(frame_type, data, sse)
+    except Exception as e:
+        print(f"Streaming response failed: {str(e)}")
+        yield encode_frame("error", {"detail": str(e)}, sse)
+
+
+def stream_frames(request: Request, frames: AsyncIterator[Tuple[str, Any]], sse: Optional[bool] = None) -> StreamingResponse:
+    """Stream (type, data) frames in the format the client asked for, unless `sse` forces one"""
+    if sse is None:
+        sse = wants_sse(request)
+    return StreamingResponse(
+        encode_frames(frames, sse),
+        media_type=SSE_MEDIA_TYPE if sse else NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+__all__ = ["wants_sse", "encode_frame", "encode_frames", "stream_frames"]
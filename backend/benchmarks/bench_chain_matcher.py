@@ -0,0 +1,110 @@
+"""Benchmark chain detection: the old substring scan versus ChainMatcher's Aho-Corasick automaton.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_chain_matcher
+
+Three implementations are timed per business name:
+
+- "old": the original is_chain_business, lowercasing the name and testing
+  every brand with `in` (no normalization, no word boundaries).
+- "scan": the same loop over normalized, space-padded brands, so it gives the
+  same answers as the automaton. This is the simple alternative at the
+  current dictionary's feature set.
+- "automaton": ChainMatcher.matches.
+
+Brand counts cover the old hard-coded list (35), the shipped dictionary and
+larger synthetic dictionaries. Names mix realistic local-business words and
+contain a brand about one time in ten. Each timing is the best of REPEATS runs.
+"""
+
+import random
+import string
+import sys
+import time
+from typing import Callable, List
+
+from app.libs.chain_matcher import DEFAULT_CHAIN_BRANDS_PATH, ChainMatcher, load_brands, normalize_name
+
+NAMES = 20_000
+REPEATS = 5
+SYNTHETIC_SIZES = [500, 2_000, 5_000]
+
+NAME_WORDS = [
+    "Joe's", "Main", "Street", "Diner", "Auto", "Repair", "Salon", "Family", "Dental", "Bakery",
+    "Plumbing", "Heating", "Pizza", "Cafe", "Coffee", "Hair", "Studio", "Lethbridge", "Prairie", "Coulee",
+    "Law", "Office", "Pet", "Grooming", "Fitness", "Yoga", "Bistro", "Garden", "Centre", "& Sons",
+]
+
+
+class SubstringScan:
+    """Normalized, word-bounded brand test with one `in` check per brand"""
+
+    def __init__(self, brands: List[str]):
+        self.patterns = [f" {brand} " for brand in dict.fromkeys(normalize_name(b) for b in brands) if brand]
+
+    def matches(self, name: str) -> bool:
+        padded = f" {normalize_name(name)} "
+        for pattern in self.patterns:
+            if pattern in padded:
+                return True
+        return False
+
+
+def old_is_chain(brands: List[str]) -> Callable[[str], bool]:
+    """The pre-ChainMatcher check: any lowercased brand as a plain substring"""
+    indicators = [brand.lower() for brand in brands]
+
+    def is_chain(name: str) -> bool:
+        name_lower = name.lower()
+        for indicator in indicators:
+            if indicator in name_lower:
+                return True
+        return False
+    return is_chain
+
+
+def make_names(brands: List[str], rng: random.Random) -> List[str]:
+    names = []
+    for _ in range(NAMES):
+        name = " ".join(rng.sample(NAME_WORDS, rng.randint(1, 4)))
+        if rng.random() < 0.1:
+            name = f"{rng.choice(brands).title()} {name}"
+        names.append(name)
+    return names
+
+
+def per_name_us(check: Callable[[str], bool], names: List[str]) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for name in names:
+            check(name)
+        best = min(best, time.perf_counter() - started)
+    return best / len(names) * 1e6
+
+
+def run() -> None:
+    rng = random.Random(0)
+    shipped = load_brands(DEFAULT_CHAIN_BRANDS_PATH)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(20_000)]
+    synthetic = [" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(max(SYNTHETIC_SIZES))]
+
+    cases = [("old list", shipped[:35]), ("shipped", shipped)] + [("synthetic", synthetic[:size]) for size in SYNTHETIC_SIZES]
+    print(f"{'dictionary':>10} {'brands':>6} {'old us':>7} {'scan us':>8} {'automaton us':>13} {'build ms':>9}")
+    for label, brands in cases:
+        names = make_names(brands, rng)
+        started = time.perf_counter()
+        matcher = ChainMatcher(brands)
+        build_ms = (time.perf_counter() - started) * 1000
+        scan = SubstringScan(brands)
+        assert [matcher.matches(name) for name in names] == [scan.matches(name) for name in names]
+
+        print(
+            f"{label:>10} {len(brands):>6} {per_name_us(old_is_chain(brands), names):>7.2f} "
+            f"{per_name_us(scan.matches, names):>8.2f} {per_name_us(matcher.matches, names):>13.2f} {build_ms:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,178 @@
+"""Benchmark extract_business_data against the per-place extraction it replaced.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_extract              # 1k, 10k and 100k places
+    python -m benchmarks.bench_extract 5000 50000
+
+"per place" is the previous implementation, copied below: it builds a
+validated BusinessContact and BusinessData for every place and rebuilds the
+Google Maps URL with string formatting each time. "batch" is the current
+extract_business_data: plain field dicts built with precomputed URL prefixes,
+then one TypeAdapter(List[BusinessData]) validation for the whole page. Both
+validate every field; the outputs are checked for equality before timing.
+
+Each size is timed at least REPEATS times per path (more for small sizes, so
+about MIN_PLACES_TIMED places are timed in total) and the best run is
+reported, with the garbage collector run beforehand so earlier sizes do not
+skew later ones.
+"""
+
+import gc
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.apis.serper import BusinessContact, BusinessData, extract_business_data
+
+SIZES = [1_000, 10_000, 100_000]
+REPEATS = 5
+MIN_PLACES_TIMED = 50_000
+
+
+def per_place_business(item: Dict[str, Any], has_website: bool, rating: Optional[float]) -> BusinessData:
+    """The previous build_business: two validated models per place"""
+    business_hours = item.get("workingHours") if "workingHours" in item else None
+    email = None
+    if "serviceOptions" in item and isinstance(item["serviceOptions"], dict):
+        email = item["serviceOptions"].get("email")
+    social_media = []
+    if "socialMedia" in item and isinstance(item["socialMedia"], dict):
+        for platform, url in item["socialMedia"].items():
+            if url and isinstance(url, str):
+                social_media.append(url)
+    contact = BusinessContact(
+        phone=item.get("phoneNumber"),
+        address=item.get("address"),
+        website=item.get("website") if has_website else None
+    )
+    google_maps_url = None
+    if "placeId" in item and item.get("placeId"):
+        google_maps_url = f"https://www.google.com/maps/place/?q=place_id:{item.get('placeId')}"
+    elif "cid" in item and item.get("cid"):
+        google_maps_url = f"https://maps.google.com/?cid={item.get('cid')}"
+    elif "latitude" in item and "longitude" in item:
+        lat = item.get("latitude")
+        lng = item.get("longitude")
+        google_maps_url = f"https://www.google.com/maps/search/?api=1&query={lat},{lng}"
+        if "title" in item:
+            title = item.get("title", "Business").replace(" ", "+")
+            google_maps_url = f"https://www.google.com/maps/search/{title}/@{lat},{lng},15z/"
+    latitude = None
+    longitude = None
+    if "latitude" in item and "longitude" in item:
+        try:
+            latitude = float(item.get("latitude"))
+            longitude = float(item.get("longitude"))
+        except (ValueError, TypeError):
+            pass
+    price_level = item.get("priceLevel") if "priceLevel" in item else None
+    return BusinessData(
+        name=item.get("title", "Unknown"),
+        rating=rating,
+        reviews_count=item.get("ratingCount"),
+        has_website=has_website,
+        category=item.get("category"),
+        contact=contact,
+        google_maps_url=google_maps_url,
+        image_url=item.get("thumbnailUrl"),
+        business_hours=business_hours,
+        social_media=social_media if social_media else None,
+        email=email,
+        latitude=latitude,
+        longitude=longitude,
+        price_level=price_level,
+        place_id=str(item["placeId"]) if item.get("placeId") else None,
+        cid=str(item["cid"]) if item.get("cid") else None
+    )
+
+
+def extract_per_place(search_results: Dict[str, Any], max_results: int, filter_no_website: bool = False, max_rating: Optional[float] = None) -> List[BusinessData]:
+    """The previous extract_business_data"""
+    businesses = []
+    if "places" not in search_results or not search_results["places"]:
+        return businesses
+    for item in search_results["places"]:
+        if len(businesses) >= max_results:
+            break
+        has_website = "website" in item and bool(item["website"])
+        if filter_no_website and has_website:
+            continue
+        rating = None
+        if "rating" in item:
+            try:
+                rating = float(item["rating"])
+                if max_rating is not None and rating > max_rating:
+                    continue
+            except (ValueError, TypeError):
+                pass
+        businesses.append(per_place_business(item, has_website, rating))
+    return businesses
+
+
+def make_place(i: int, rng: random.Random) -> Dict[str, Any]:
+    """A Serper place shaped like real responses, with optional fields present at realistic rates"""
+    place = {
+        "title": f"Biz {i} Cafe",
+        "address": f"{i} Main St, Lethbridge, AB",
+        "category": rng.choice(["Cafe", "Restaurant", "Plumber", None]),
+        "phoneNumber": f"+1 403-555-{i % 10000:04d}",
+    }
+    if rng.random() < 0.5:
+        place["website"] = rng.choice(["https://example.com", ""])
+    if rng.random() < 0.8:
+        place["rating"] = rng.choice([4.5, 3.0, 2.5, 1.0, "n/a"])
+        place["ratingCount"] = rng.choice([12, 0, 250])
+    identifier = rng.random()
+    if identifier < 0.6:
+        place["placeId"] = f"ChIJ{i}"
+    elif identifier < 0.9:
+        place["cid"] = str(10**12 + i)
+    if rng.random() < 0.9:
+        place["latitude"] = 49.69 + rng.random()
+        place["longitude"] = -112.8 + rng.random()
+    if rng.random() < 0.3:
+        place["workingHours"] = "Mon-Fri 9-5"
+    if rng.random() < 0.2:
+        place["thumbnailUrl"] = "https://lh5.googleusercontent.com/p/example"
+    if rng.random() < 0.2:
+        place["priceLevel"] = "$$"
+    if rng.random() < 0.1:
+        place["serviceOptions"] = {"email": f"info{i}@example.com"}
+    if rng.random() < 0.1:
+        place["socialMedia"] = {"facebook": f"https://facebook.com/biz{i}", "instagram": ""}
+    return place
+
+
+def best_of(fn: Callable[[], Any], repeats: int = REPEATS) -> float:
+    """Fastest wall time of `repeats` calls, in seconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(sizes: List[int]) -> None:
+    rng = random.Random(0)
+    print(f"{'places':>8} {'per place ms':>13} {'batch ms':>9} {'speedup':>8}")
+    for size in sizes:
+        data = {"places": [make_place(i, rng) for i in range(size)]}
+        for kwargs in ({}, {"filter_no_website": True, "max_rating": 3.0}):
+            expected = extract_per_place(data, size, **kwargs)
+            actual = extract_business_data(data, size, **kwargs)
+            assert actual == expected
+            assert [b.model_dump(exclude_unset=True) for b in actual] == [b.model_dump(exclude_unset=True) for b in expected]
+        del expected, actual
+
+        repeats = max(REPEATS, MIN_PLACES_TIMED // size)
+        per_place_time = best_of(lambda: extract_per_place(data, size), repeats)
+        batch_time = best_of(lambda: extract_business_data(data, size), repeats)
+        print(f"{size:>8} {per_place_time * 1000:>13.1f} {batch_time * 1000:>9.1f} {per_place_time / batch_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or SIZES)
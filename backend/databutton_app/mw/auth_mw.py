@@ -1,10 +1,20 @@
+import asyncio
 import functools
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
 from http import HTTPStatus
-from typing import Annotated, Callable
+from typing import Annotated, Any, Callable
 import jwt
 from fastapi import Depends, HTTPException, WebSocket, WebSocketException, status
 from fastapi.requests import HTTPConnection
-from jwt import PyJWKClient
+from jwt import PyJWK, PyJWKSet
 from pydantic import BaseModel
 from starlette.requests import Request
 
@@ -26,6 +36,106 @@ class User(BaseModel):
     email: str | None = None
 
 
+class VerifiedTokenCache:
+    """Bounded LRU of tokens that passed verification, keyed by a digest of audience and token.
+
+    Entries hold the parsed User, the token's exp and the kid of the key that
+    signed it. They are dropped once exp passes, or when that kid disappears
+    from the JWKS on a key refresh (see retain_kids), so a hit is as good as a
+    fresh verification.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, tuple[User, float, str | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._kids: set[str] | None = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.rotated = 0
+
+    @staticmethod
+    def _digest(token: str, audience: str) -> bytes:
+        return hashlib.sha256(f"{audience}\0{token}".encode("utf-8")).digest()
+
+    def get(self, token: str, audience: str) -> User | None:
+        digest = self._digest(token, audience)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                user, exp, _ = entry
+                if time.time() < exp:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return user
+                del self._entries[digest]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, token: str, audience: str, user: User, exp: Any, kid: str | None) -> None:
+        # Tokens without a numeric exp are never cached
+        if not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+        digest = self._digest(token, audience)
+        with self._lock:
+            self._entries[digest] = (user, float(exp), kid)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def retain_kids(self, kids: set[str]) -> None:
+        """Drop entries signed by keys that are no longer published"""
+        with self._lock:
+            if kids == self._kids:
+                return
+            self._kids = set(kids)
+            stale = [d for d, (_, _, kid) in self._entries.items() if kid not in kids]
+            for digest in stale:
+                del self._entries[digest]
+            self.rotated += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "rotated": self.rotated,
+        }
+
+
+TOKEN_CACHE = VerifiedTokenCache(
+    int(os.environ.get("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+)
+
+JWKS_REFRESH_SECONDS = float(os.environ.get("AUTH_JWKS_REFRESH_SECONDS", "3600"))
+JWKS_RETRY_SECONDS = float(os.environ.get("AUTH_JWKS_RETRY_SECONDS", "30"))
+JWKS_MIN_REFRESH_SECONDS = float(os.environ.get("AUTH_JWKS_MIN_REFRESH_SECONDS", "30"))
+JWKS_FETCH_TIMEOUT = float(os.environ.get("AUTH_JWKS_FETCH_TIMEOUT", "10"))
+
+# Called with ("cached" | "verified" | "rejected", seconds) for every token authorized
+AuthObserver = Callable[[str, float], None]
+_auth_observer: AuthObserver | None = None
+
+
+def set_auth_observer(observer: AuthObserver | None) -> None:
+    """Register the app's callback for token authorization results and timings"""
+    global _auth_observer
+    _auth_observer = observer
+
+
 def get_auth_config(request: HTTPConnection) -> AuthConfig:
     auth_config: AuthConfig | None = request.app.state.auth_config
 
@@ -75,20 +185,192 @@ def get_authorized_user(
         )
 
 
-@functools.cache
-def get_jwks_client(url: str):
-    """Reuse client cached by its url, client caches keys by default."""
-    return PyJWKClient(url, cache_keys=True)
+class JWKSKeyStore:
+    """Signing keys for one JWKS url, held in memory and refreshed in the background.
+
+    Requests only read `keys` and never touch the network or disk. start()
+    prefetches the keys on app startup (falling back to the last known keys
+    saved in `cache_path`) and runs a refresh task that refetches ahead of the
+    JWKS max-age, or every `refresh_seconds` when no max-age is sent. Keys are
+    published before tokens are signed with them, so the max-age refresh picks
+    up rotations. A token with an unknown kid is rejected and wakes the refresh
+    task, which fetches at most once per `min_refresh_seconds`.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        cache_path: str | None = None,
+        refresh_seconds: float = JWKS_REFRESH_SECONDS,
+        retry_seconds: float = JWKS_RETRY_SECONDS,
+        min_refresh_seconds: float = JWKS_MIN_REFRESH_SECONDS,
+        timeout: float = JWKS_FETCH_TIMEOUT,
+    ):
+        self.url = url
+        self.cache_path = cache_path or os.path.join(
+            tempfile.gettempdir(),
+            f"jwks-{hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]}.json",
+        )
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self.timeout = timeout
+        self.keys: dict[str, PyJWK] = {}
+        self.fetched_at: float | None = None
+        self.source: str | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._last_fetch = float("-inf")
+        self.fetches = 0
+        self.fetch_failures = 0
+        self.unknown_kids = 0
+
+    def _set_keys(self, jwks: dict[str, Any], fetched_at: float, source: str) -> None:
+        keys = {k.key_id: k for k in PyJWKSet.from_dict(jwks).keys if k.key_id}
+        if not keys:
+            raise ValueError("JWKS has no usable signing keys")
+        self.keys = keys
+        self.fetched_at = fetched_at
+        self.source = source
+        # Forget tokens signed by keys that have rotated out of the JWKS
+        TOKEN_CACHE.retain_kids(set(keys))
+
+    def load_file(self) -> bool:
+        """Load the last known keys from cache_path; returns whether any were loaded"""
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("url") != self.url:
+                return False
+            self._set_keys(saved["jwks"], saved["fetched_at"], "file")
+            print(f"Loaded {len(self.keys)} JWKS keys from {self.cache_path}")
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Failed to load JWKS cache file {self.cache_path}: {e}")
+            return False
+
+    def fetch(self) -> float:
+        """Download the JWKS, swap in its keys and save them (blocking); returns seconds until the next refresh"""
+        self.fetches += 1
+        self._last_fetch = time.monotonic()
+        request = urllib.request.Request(self.url, headers={"User-Agent": "databutton-app"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            jwks = json.load(response)
+            max_age = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        fetched_at = time.time()
+        self._set_keys(jwks, fetched_at, "network")
+
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"url": self.url, "fetched_at": fetched_at, "jwks": jwks}, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"Failed to save JWKS cache file {self.cache_path}: {e}")
+
+        if max_age:
+            # Refresh well before the published keys expire
+            return max(self.min_refresh_seconds, min(self.refresh_seconds, int(max_age.group(1)) * 0.8))
+        return self.refresh_seconds
+
+    def get_signing_key(self, kid: str | None) -> PyJWK | None:
+        """Key for a kid from memory; an unknown kid wakes the refresh task and returns None"""
+        if not kid:
+            return None
+        key = self.keys.get(kid)
+        if key is None:
+            self.unknown_kids += 1
+            self.request_refresh()
+        return key
+
+    def request_refresh(self) -> None:
+        """Wake the refresh task; safe to call from request threads"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _refresh_loop(self, delay: float) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                # Woken by an unknown kid; do not refetch more often than min_refresh_seconds
+                await asyncio.sleep(max(0.0, self._last_fetch + self.min_refresh_seconds - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                delay = await asyncio.to_thread(self.fetch)
+            except Exception as e:
+                self.fetch_failures += 1
+                print(f"JWKS refresh from {self.url} failed: {e}")
+                delay = self.retry_seconds
+
+    async def start(self) -> None:
+        """Prefetch the keys (or load the saved ones) and start the background refresh task"""
+        if self._task is not None:
+            return
+        try:
+            delay = await asyncio.to_thread(self.fetch)
+            print(f"Prefetched {len(self.keys)} JWKS keys from {self.url}")
+        except Exception as e:
+            self.fetch_failures += 1
+            print(f"JWKS prefetch from {self.url} failed: {e}")
+            if not self.keys:
+                self.load_file()
+            delay = self.retry_seconds
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._refresh_loop(delay))
+
+    async def stop(self) -> None:
+        """Cancel the background refresh task"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        self._wake = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "keys": sorted(self.keys),
+            "source": self.source,
+            "age_seconds": time.time() - self.fetched_at if self.fetched_at else None,
+            "fetches": self.fetches,
+            "fetch_failures": self.fetch_failures,
+            "unknown_kids": self.unknown_kids,
+            "refreshing": self._task is not None,
+        }
 
 
-def get_signing_key(url: str, token: str) -> tuple[str, str]:
-    client = get_jwks_client(url)
-    signing_key = client.get_signing_key_from_jwt(token)
+@functools.cache
+def get_jwks_store(url: str) -> JWKSKeyStore:
+    """Key store shared by every request using this JWKS url, seeded with the saved keys"""
+    store = JWKSKeyStore(url, cache_path=os.environ.get("AUTH_JWKS_CACHE_FILE") or None)
+    store.load_file()
+    return store
+
+
+def get_signing_key(url: str, token: str) -> tuple[str, str, str | None]:
+    kid = jwt.get_unverified_header(token).get("kid")
+    signing_key = get_jwks_store(url).get_signing_key(kid)
+    if signing_key is None:
+        raise ValueError(f"Unknown signing key id '{kid}'")
     key = signing_key.key
     alg = signing_key.algorithm_name
     if alg != "RS256":
         raise ValueError(f"Unsupported signing algorithm: {alg}")
-    return (key, alg)
+    return (key, alg, signing_key.key_id)
 
 
 def authorize_websocket(
@@ -137,14 +419,34 @@ def authorize_request(
 def authorize_token(
     token: str,
     auth_config: AuthConfig,
+) -> User | None:
+    started = time.perf_counter()
+
+    # Tokens already verified for this audience skip the signature check
+    user = TOKEN_CACHE.get(token, auth_config.audience)
+    if user is not None:
+        result = "cached"
+    else:
+        user = verify_token(token, auth_config)
+        result = "verified" if user is not None else "rejected"
+
+    if _auth_observer is not None:
+        _auth_observer(result, time.perf_counter() - started)
+    return user
+
+
+def verify_token(
+    token: str,
+    auth_config: AuthConfig,
 ) -> User | None:
     # Audience and jwks url to get signing key from based on the users config
     jwks_urls = [(auth_config.audience, auth_config.jwks_url)]
 
     payload = None
+    kid = None
     for audience, jwks_url in jwks_urls:
         try:
-            key, alg = get_signing_key(jwks_url, token)
+            key, alg, kid = get_signing_key(jwks_url, token)
         except Exception as e:
             print(f"Failed to get signing key {e}")
             continue
@@ -163,7 +465,9 @@ def authorize_token(
     try:
         user = User.model_validate(payload)
         print(f"User {user.sub} authenticated")
-        return user
     except Exception as e:
         print(f"Failed to parse token payload {e}")
         return None
+
+    TOKEN_CACHE.put(token, auth_config.audience, user, payload.get("exp"), kid)
+    return user
@@ -1,12 +1,29 @@
 import os
 import pathlib
 import json
+import secrets
 import dotenv
-from fastapi import FastAPI, APIRouter, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 
 dotenv.load_dotenv()
 
-from databutton_app.mw.auth_mw import AuthConfig, get_authorized_user
+# Firebase signing keys; override to point at another JWKS (e.g. a local stand-in for testing)
+AUTH_JWKS_URL = os.environ.get(
+    "AUTH_JWKS_URL",
+    "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com",
+)
+
+# GET /metrics is only served when enabled; setting METRICS_TOKEN enables it and requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() in ("1", "true", "yes") or METRICS_TOKEN is not None
+
+from databutton_app.mw.auth_mw import AuthConfig, get_authorized_user, get_jwks_store, set_auth_observer
+from app.libs.serper_client import startup_serper_client, shutdown_serper_client
+from app.libs.chain_matcher import get_chain_matcher
+from app.libs.gemini_clients import get_gemini_client_pool
+from app.libs.metrics import AUTH_LATENCY, CACHE_LOOKUPS, MetricsMiddleware, render_metrics
 
 
 def get_router_config() -> dict:
@@ -74,10 +91,48 @@ def get_firebase_config() -> dict | None:
     return None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream clients on startup and release them on shutdown."""
+    await startup_serper_client()
+    get_chain_matcher()  # Build the chain brand automaton before the first request
+    # Fetch signing keys now so no request waits on the JWKS, and keep them fresh in the background
+    jwks_store = get_jwks_store(app.state.auth_config.jwks_url) if app.state.auth_config else None
+    if jwks_store is not None:
+        await jwks_store.start()
+    try:
+        yield
+    finally:
+        if jwks_store is not None:
+            await jwks_store.stop()
+        await shutdown_serper_client()
+        get_gemini_client_pool().shutdown()
+
+
+def get_metrics(request: Request) -> PlainTextResponse:
+    """Request, upstream, auth, cache and retry metrics in Prometheus text format."""
+    if METRICS_TOKEN is not None:
+        auth_header = request.headers.get("authorization", "")
+        token = auth_header[7:] if auth_header.startswith("Bearer ") else ""
+        if not secrets.compare_digest(token.encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def observe_auth(result: str, seconds: float) -> None:
+    """Record token authorization in the app metrics; the auth middleware does not depend on app.libs."""
+    CACHE_LOOKUPS.inc("auth_tokens", "hit" if result == "cached" else "miss")
+    AUTH_LATENCY.observe(seconds, result)
+
+
 def create_app() -> FastAPI:
     """Create the app. This is called by uvicorn with the factory option to construct the app object."""
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(MetricsMiddleware)
+    set_auth_observer(observe_auth)
     app.include_router(import_api_routers())
+    if METRICS_ENABLED:
+        app.add_api_route("/metrics", get_metrics, methods=["GET"], include_in_schema=False)
 
     for route in app.routes:
         if hasattr(route, "methods"):
@@ -92,7 +147,7 @@ def create_app() -> FastAPI:
     else:
         print("Firebase config found")
         auth_config = {
-            "jwks_url": "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com",
+            "jwks_url": AUTH_JWKS_URL,
             "audience": firebase_config["projectId"],
             "header": "authorization",
         }
@@ -0,0 +1,234 @@
+import asyncio
+import http.server
+import json
+import threading
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from databutton_app.mw import auth_mw
+from databutton_app.mw.auth_mw import TOKEN_CACHE, AuthConfig, JWKSKeyStore, User
+
+PRIVATE_KEYS = {
+    kid: rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    for kid in ("k1", "k2", "k3")
+}
+
+
+class JWKSServer:
+    """Local stand-in for a JWKS endpoint whose published keys can be rotated"""
+
+    def __init__(self):
+        self.published = ["k1"]
+        self.max_age: int | None = 3600
+        self.up = True
+        self.fetches = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.fetches += 1
+                if not server.up:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps({"keys": [server.jwk(kid) for kid in server.published]}).encode("utf-8")
+                self.send_response(200)
+                if server.max_age is not None:
+                    self.send_header("Cache-Control", f"public, max-age={server.max_age}")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/jwks"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def jwk(kid: str) -> dict:
+        public = json.loads(RSAAlgorithm.to_jwk(PRIVATE_KEYS[kid].public_key()))
+        return {**public, "kid": kid, "alg": "RS256", "use": "sig"}
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    jwks_server = JWKSServer()
+    # Stores are cached per url, and a later server may reuse this port
+    auth_mw.get_jwks_store.cache_clear()
+    yield jwks_server
+    jwks_server.close()
+    auth_mw.get_jwks_store.cache_clear()
+
+
+@pytest.fixture
+def make_store(server, tmp_path):
+    def make(**kwargs):
+        kwargs.setdefault("cache_path", str(tmp_path / "jwks.json"))
+        kwargs.setdefault("min_refresh_seconds", 60)
+        return JWKSKeyStore(server.url, **kwargs)
+    return make
+
+
+def make_token(kid: str, sub: str = "user-1", audience: str = "proj") -> str:
+    claims = {"sub": sub, "aud": audience, "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, PRIVATE_KEYS[kid], algorithm="RS256", headers={"kid": kid})
+
+
+def test_unknown_kid_is_rejected_without_fetching(server, make_store):
+    store = make_store(min_refresh_seconds=0)
+    store.fetch()
+    server.published = ["k1", "k2"]
+
+    # The request path only reads memory; without a refresh task there is nothing to wake
+    assert store.get_signing_key("k2") is None
+    assert store.get_signing_key("") is None
+    assert server.fetches == 1
+    assert store.unknown_kids == 1
+
+
+def test_first_token_after_rotation_is_accepted_after_refresh(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("AUTH_JWKS_CACHE_FILE", str(tmp_path / "jwks.json"))
+    config = AuthConfig(jwks_url=server.url, audience="proj", header="authorization")
+    store = auth_mw.get_jwks_store(server.url)
+    store.min_refresh_seconds = 0.1
+
+    async def scenario():
+        await store.start()
+        try:
+            assert auth_mw.authorize_token(make_token("k1"), config) == User(sub="user-1")
+            server.published = ["k2"]
+            fetches = server.fetches
+            # Rejected without a fetch in the request path; the refresh task picks up the new key
+            assert auth_mw.authorize_token(make_token("k2", "user-2"), config) is None
+            assert server.fetches == fetches
+            await asyncio.sleep(0.5)
+            return auth_mw.authorize_token(make_token("k2", "user-2"), config)
+        finally:
+            await store.stop()
+
+    assert asyncio.run(scenario()) == User(sub="user-2")
+    assert sorted(store.keys) == ["k2"]
+
+
+def test_refresh_loop_follows_max_age(server, make_store):
+    async def scenario(store):
+        server.max_age = 1
+        await store.start()
+        try:
+            server.published = ["k2"]
+            # max-age=1 schedules the next refresh 0.8 seconds after the prefetch
+            await asyncio.sleep(1.5)
+            return sorted(store.keys)
+        finally:
+            await store.stop()
+
+    store = make_store(min_refresh_seconds=0.1)
+    assert asyncio.run(scenario(store)) == ["k2"]
+    assert server.fetches >= 2
+    assert store.stats()["refreshing"] is False
+
+
+def test_refresh_loop_wakes_for_unknown_kid(server, make_store):
+    async def scenario(store):
+        await store.start()
+        try:
+            server.published = ["k1", "k2"]
+            # Unknown kids wake the background task, which fetches once the window passes
+            assert store.get_signing_key("k2") is None
+            assert store.get_signing_key("forged") is None
+            await asyncio.sleep(0.5)
+            return store.get_signing_key("k2")
+        finally:
+            await store.stop()
+
+    store = make_store(min_refresh_seconds=0.2)
+    key = asyncio.run(scenario(store))
+    assert key is not None and key.key_id == "k2"
+    assert server.fetches == 2
+
+
+def test_start_falls_back_to_saved_keys(server, make_store):
+    make_store().fetch()
+    server.up = False
+
+    async def scenario(store):
+        await store.start()
+        try:
+            return store.stats()
+        finally:
+            await store.stop()
+
+    store = make_store()
+    stats = asyncio.run(scenario(store))
+    assert stats["source"] == "file"
+    assert stats["keys"] == ["k1"]
+    assert stats["fetch_failures"] == 1
+
+
+def test_shared_store_is_seeded_from_saved_keys(server, make_store, tmp_path, monkeypatch):
+    make_store().fetch()
+    server.up = False
+    monkeypatch.setenv("AUTH_JWKS_CACHE_FILE", str(tmp_path / "jwks.json"))
+
+    store = auth_mw.get_jwks_store(server.url)
+    key = store.get_signing_key("k1")
+    assert key is not None and store.source == "file"
+    assert server.fetches == 1
+
+
+def test_saved_keys_for_another_url_are_ignored(server, make_store, tmp_path):
+    make_store().fetch()
+    server.up = False
+
+    other = JWKSKeyStore("http://127.0.0.1:9/jwks", cache_path=str(tmp_path / "jwks.json"), timeout=1)
+    assert other.load_file() is False
+
+
+def test_rotation_evicts_cached_tokens_of_removed_keys(server, make_store):
+    TOKEN_CACHE.clear()
+    server.published = ["k1", "k2", "k3"]
+    store = make_store(min_refresh_seconds=0)
+    store.fetch()
+    exp = time.time() + 3600
+    TOKEN_CACHE.put("token-1", "proj", User(sub="user-1"), exp, "k1")
+    TOKEN_CACHE.put("token-2", "proj", User(sub="user-2"), exp, "k2")
+    rotated = TOKEN_CACHE.rotated
+
+    server.published = ["k2", "k3"]
+    store.fetch()
+
+    assert TOKEN_CACHE.get("token-1", "proj") is None
+    assert TOKEN_CACHE.get("token-2", "proj") == User(sub="user-2")
+    assert TOKEN_CACHE.rotated == rotated + 1
+
+    # An unchanged key set skips the scan entirely
+    store.fetch()
+    assert TOKEN_CACHE.rotated == rotated + 1
+    TOKEN_CACHE.clear()
+
+
+def test_auth_observer_receives_results(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("AUTH_JWKS_CACHE_FILE", str(tmp_path / "jwks.json"))
+    config = AuthConfig(jwks_url=server.url, audience="proj", header="authorization")
+    auth_mw.get_jwks_store(server.url).fetch()
+    observed = []
+    auth_mw.set_auth_observer(lambda result, seconds: observed.append(result))
+    try:
+        token = make_token("k1")
+        auth_mw.authorize_token(token, config)
+        auth_mw.authorize_token(token, config)
+        auth_mw.authorize_token(make_token("k1", audience="other"), config)
+    finally:
+        auth_mw.set_auth_observer(None)
+        TOKEN_CACHE.clear()
+
+    assert observed == ["verified", "cached", "rejected"]